@@ -0,0 +1,110 @@
+# core/browser_pool.py
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from core.browser_setup import setup_browser
+
+class BrowserPool:
+    """
+    Keeps a fixed number of Chrome drivers alive and lends them out, so consecutive
+    audits do not each pay the browser startup cost.
+    A driver is recycled after max_uses audits, or immediately if an audit raised while using it.
+    Returned drivers are reset (cookies, site storage, window size) so one audit cannot affect the next.
+    """
+
+    def __init__(self, size=4, max_uses=50, prewarm=True, **browser_kwargs):
+        self.size = size
+        self.max_uses = max_uses
+        self.browser_kwargs = browser_kwargs # Passed to setup_browser
+        self._idle = queue.Queue()
+        self._uses = {} # id(driver) -> number of audits served
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            # Empty slots (None) are filled lazily on acquire, so a failed launch only affects that audit
+            self._idle.put(self._spawn() if prewarm else None)
+
+    def _spawn(self):
+        driver = setup_browser(**self.browser_kwargs)
+        with self._lock: self._uses[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock: self._uses.pop(id(driver), None)
+        try: driver.quit()
+        except Exception as quit_err: print(f"  Warning: Error closing pooled browser: {quit_err}")
+
+    @staticmethod
+    def _reset(driver):
+        """Clear what a capture leaves behind: the page's site storage, all cookies and a resized window."""
+        origin = driver.execute_script("return window.location.origin;")
+        if origin and origin != "null":
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {}) # Every domain, unlike delete_all_cookies()
+        driver.get("about:blank")
+        driver.maximize_window() # Undo the full-page-height resize of the screenshot fallback
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a driver for the duration of a with-block."""
+        if self._closed: raise RuntimeError("BrowserPool is closed")
+        driver = self._idle.get()
+        if driver is None:
+            try: driver = self._spawn()
+            except Exception:
+                self._idle.put(None) # Give the slot back before surfacing the launch error
+                raise
+        failed = True
+        try:
+            yield driver
+            failed = False
+        finally:
+            self.release(driver, failed=failed)
+
+    def release(self, driver, failed=False):
+        """Return a driver to the pool, replacing it if it failed, has reached max_uses or could not be reset."""
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if not (self._closed or failed or uses >= self.max_uses):
+            try: self._reset(driver)
+            except Exception as reset_err:
+                print(f"  Warning: Could not reset pooled browser, replacing it: {reset_err}")
+                failed = True
+        if self._closed:
+            self._discard(driver)
+        elif failed or uses >= self.max_uses:
+            self._discard(driver)
+            self._idle.put(None)
+        else:
+            self._idle.put(driver)
+
+    def close(self):
+        """Quit every idle driver. Drivers still on loan are quit when released."""
+        self._closed = True
+        while True:
+            try: driver = self._idle.get_nowait()
+            except queue.Empty: break
+            if driver is not None: self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def borrowed_browser(pool: Optional[BrowserPool] = None, **browser_kwargs):
+    """Yield a driver from pool, or a one-off browser (quit afterwards) when no pool is given."""
+    if pool is not None:
+        with pool.acquire() as driver:
+            yield driver
+        return
+    driver = setup_browser(**browser_kwargs)
+    try:
+        yield driver
+    finally:
+        driver.quit()
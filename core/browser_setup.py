@@ -1,13 +1,25 @@
 # core/browser_setup.py (Simplified)
+import os
+import shutil
+import pathlib
 import undetected_chromedriver as uc
 
-def setup_browser():
-    """
-    Configure and initialize a browser with anti-detection measures.
+# Patched chromedriver kept between runs so uc can skip the download/version probe
+DRIVER_CACHE_PATH = pathlib.Path.home() / ".cache" / "audit-automate" / ("chromedriver.exe" if os.name == "nt" else "chromedriver")
 
-    Returns:
-        webdriver: Configured undetected Chrome webdriver
-    """
+def _cache_driver_binary(driver):
+    """Copy the chromedriver uc just resolved and patched into the cache for the next launch."""
+    try:
+        resolved = getattr(getattr(driver, "patcher", None), "executable_path", None)
+        if resolved and os.path.exists(resolved) and not DRIVER_CACHE_PATH.exists():
+            DRIVER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(resolved, DRIVER_CACHE_PATH)
+            print(f"Cached chromedriver at: {DRIVER_CACHE_PATH}")
+    except Exception as cache_err:
+        print(f"Warning: Could not cache chromedriver: {cache_err}")
+
+def _build_options():
+    """Chrome options with anti-detection measures (uc will not reuse an options object across launches)."""
     options = uc.ChromeOptions()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
@@ -17,13 +29,34 @@ def setup_browser():
     options.add_argument("--disable-infobars")
     options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36') # Keep a reasonable UA
 
-    # Consider adding options to disable images or javascript if needed for speed/stability
-    # options.add_argument('--blink-settings=imagesEnabled=false')
+    # Background subsystems an audit never uses
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-sync")
+    return options
 
+def setup_browser():
+    """
+    Configure and initialize a browser with anti-detection measures.
+    Reuses the cached patched chromedriver when present, falling back to uc's own resolution.
+
+    Returns:
+        webdriver: Configured undetected Chrome webdriver
+    """
     try:
         print("Initializing undetected ChromeDriver...")
-        # driver = uc.Chrome(options=options, driver_executable_path='/path/to/chromedriver')
-        driver = uc.Chrome(options=options) # Let the library detect the version
+        if DRIVER_CACHE_PATH.exists():
+            try:
+                driver = uc.Chrome(options=_build_options(), driver_executable_path=str(DRIVER_CACHE_PATH))
+                print("Browser initialized (cached chromedriver).")
+                return driver
+            except Exception as cached_err:
+                # Most likely Chrome updated and the cached driver no longer matches
+                print(f"Cached chromedriver failed ({cached_err}); discarding it and re-resolving.")
+                try: DRIVER_CACHE_PATH.unlink()
+                except OSError: pass
+        driver = uc.Chrome(options=_build_options()) # Let the library detect the version
+        _cache_driver_binary(driver)
         print("Browser initialized.")
         return driver
     except Exception as e:
@@ -1,42 +1,190 @@
 # audit-automate/csv_processor.py
 import os
 import csv
+import functools
+import hashlib
 import re
 import shutil
+import sys
 from datetime import datetime
-from typing import List, Optional, Dict # Import typing helpers
+from typing import List, Optional, Dict, Tuple # Import typing helpers
+
+from core.reporting_utils import report
+
+# Compiled once per process instead of once per parsed file
+# A "**Field:** value" heading line; the heading may be indented or follow a list bullet ("- **SKU:** 55")
+_HEAD_RE = re.compile(r'^[ \t]*(?:[-*+\u2022][ \t]+)?\*\*(.+?):\*\*\s*(.*)$')
+# A heading later in a line ("**Link:** u **Category:** Tools"); same name characters as the original whole-content parser
+_INLINE_HEAD_RE = re.compile(r'\*\*([a-zA-Z0-9\s+?#()]+):\*\*')
+_FILE_RE = re.compile(r'(link\d+)_(\w+)_analysis\.txt$')
+
+# Rows serialized and written per batch when writing the CSV
+_CSV_WRITE_BATCH = 5000
+
+
+@functools.lru_cache(maxsize=1024) # Heading names repeat across every file; bounded since they come from model output
+def _norm_field(name: str) -> str:
+    """Field name with whitespace runs collapsed to one space and case folded ("Images  Count" -> "images count")."""
+    return ' '.join(name.split()).casefold()
+
+
+def _build_expected_fields() -> Tuple[str, ...]:
+    """The analysis fields in CSV column order."""
+    fields = [
+        "Link", "Category", "SKU", "Retailer",
+        "Images Count", "Images Visible Issues?",
+        "Video Count", "Video Visible Issues?",
+        "A+ Content Type", "A+ Content Accuracy?",
+        "Title Actual", "Title Accuracy?",
+    ]
+    for i in range(1, 10):
+        fields.append(f"Bullet Point {i} Actual")
+        fields.append(f"Bullet Point {i} Accuracy?")
+    fields.extend([
+        "Description Actual", "Description Accuracy?",
+    ])
+    # Interned so every row dict shares the same key objects (the generated bullet names are not interned by default)
+    return tuple(sys.intern(f) for f in fields)
+
+# Analysis fields in CSV column order (a tuple, so callers cannot mutate the shared copy); also used by fix_and_convert
+EXPECTED_FIELDS = _build_expected_fields()
+# Normalized (collapsed whitespace, lowercase) form of each expected field, computed once
+NORMALIZED_FIELDS = {f: _norm_field(f) for f in EXPECTED_FIELDS}
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink src to dst (replacing dst), falling back to a copy across filesystems or where links are unsupported."""
+    if os.path.lexists(dst): os.remove(dst)
+    try: os.link(src, dst)
+    except OSError: shutil.copy2(src, dst)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_urls_cached(path: str, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    """
+    (linkX, URL) pairs from a links file. Keyed by mtime_ns so an edited file is re-read;
+    repeated CsvProcessor instances in one process otherwise share the parsed result.
+    """
+    with open(path, 'r') as f:
+        return tuple((f"link{i}", url) for i, url in enumerate((line.strip() for line in f), 1) if url)
+
+
+def load_url_map(links_file: str) -> Dict[str, str]:
+    """linkX -> URL for a links file with one URL per line (blank lines keep their number). Raises OSError."""
+    return dict(_load_urls_cached(os.path.abspath(links_file), os.stat(links_file).st_mtime_ns))
+
+
+def scan_analysis_file(file_path: str) -> Dict[str, str]:
+    """
+    Every **Field:** value in an analysis file, keyed by normalized field name (see _norm_field).
+    A heading line starts a new value and any other line continues the current one; a heading
+    later in a line ends the value before it and starts another. Raises on read errors.
+    """
+    # One unbuffered read and a single decode; TextIOWrapper's incremental decoding costs more for files this small
+    with open(file_path, 'rb', buffering=0) as f:
+        text = f.read().decode('utf-8')
+    if '\r' in text: text = text.replace('\r\n', '\n').replace('\r', '\n') # Same newlines as text mode
+    found_values = {}
+    field_name, buf = None, []
+    for line in text.split('\n'):
+        # Only lines containing "**" can hold headings; the substring test is cheaper than a failed regex match
+        if '**' in line:
+            head = _HEAD_RE.match(line)
+            if head:
+                if field_name is not None:
+                    found_values[field_name] = "\n".join(buf).strip()
+                field_name, buf, line = _norm_field(head.group(1)), [], head.group(2)
+            pos = 0
+            for inline in _INLINE_HEAD_RE.finditer(line):
+                if field_name is not None:
+                    buf.append(line[pos:inline.start()])
+                    found_values[field_name] = "\n".join(buf).strip()
+                field_name, buf, pos = _norm_field(inline.group(1)), [], inline.end()
+            line = line[pos:]
+        if field_name is not None:
+            buf.append(line)
+    if field_name is not None:
+        found_values[field_name] = "\n".join(buf).strip()
+    return found_values
+
+
+def read_analysis_fields(file_path: str, normalized_expected: Dict[str, str] = NORMALIZED_FIELDS) -> Dict[str, str]:
+    """Expected field -> value as written in an analysis file, "" where absent (Link not yet resolved). Raises on read errors."""
+    found_values = scan_analysis_file(file_path)
+    # Populate parsed_data with one dict lookup per expected field
+    return {field: found_values.get(norm, "") for field, norm in normalized_expected.items()}
+
+
+def _parse_analysis_file(file_path: str, file_name: str, url_map: Dict[str, str],
+                         normalized_expected: Dict[str, str], fields: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+    """
+    Parse an analysis file (e.g., link1_homedepot_analysis.txt) and extract field values.
+    Uses the base link ID (linkX) to set the Link field from url_map.
+    fields, if given, are the file's already-read values (e.g. for an empty file) and skip the read.
+    """
+    # Extract base link ID (linkX) from file name
+    match = _FILE_RE.match(file_name)
+    base_product_id = match.group(1) if match else None # e.g., link1
+    # retailer_name = match.group(2) if match else "Unknown"
+
+    try:
+        parsed_data = dict(fields) if fields is not None else read_analysis_fields(file_path, normalized_expected)
+
+        if base_product_id and base_product_id in url_map:
+            parsed_data["Link"] = url_map[base_product_id]
+            # print(f"  CSV Parser: Set Link for {base_product_id} from map.") # Debug
+        elif not parsed_data.get("Link"):
+             # If Link wasn't in the analysis file AND not in map, log warning
+             print(f"  CSV Parser Warning: Could not determine Link for {file_name}.")
+        # Retailer should already be correctly set by gemini_processor
+
+        return parsed_data
+
+    except FileNotFoundError:
+         print(f"Error: Analysis file not found: {file_path}")
+         return None
+    except Exception as e:
+        print(f"Error parsing {file_path}: {str(e)}")
+        # Return fallback data with Link if possible
+        empty_data = dict.fromkeys(normalized_expected, "")
+        if base_product_id and base_product_id in url_map:
+            empty_data["Link"] = url_map[base_product_id]
+        # Try to extract retailer from filename as fallback
+        if match:
+             retailer_name = match.group(2).capitalize()
+             if retailer_name == "Homedepot": retailer_name = "Home Depot"
+             empty_data["Retailer"] = retailer_name
+        return empty_data
+
 
 class CsvProcessor:
     """
     Process Gemini analysis results and output to a consolidated CSV file.
     Uses links.txt to match product URLs with their corresponding output files (using base link ID).
     Supports updating existing CSV files selectively.
+    Per-file progress lines are only printed when verbose is set; warnings and the summary always are.
     """
 
-    def __init__(self, output_folder, csv_filename="audit_results.csv", links_file="links.txt"):
+    def __init__(self, output_folder, csv_filename="audit_results.csv", links_file="links.txt", verbose=False):
         self.output_folder = output_folder
+        self.verbose = verbose
         self.csv_filename = os.path.join(output_folder, csv_filename)
         self.links_file = links_file
         self.url_map = self._load_urls_from_file()
         if not self.url_map:
              print("CSV Processor Warning: No URLs loaded. CSV 'Link' column might be incomplete.")
 
-        self.expected_fields = [
-            "Link", "Category", "SKU", "Retailer",
-            "Images Count", "Images Visible Issues?",
-            "Video Count", "Video Visible Issues?",
-            "A+ Content Type", "A+ Content Accuracy?",
-            "Title Actual", "Title Accuracy?",
-        ]
-        for i in range(1, 10):
-            self.expected_fields.append(f"Bullet Point {i} Actual")
-            self.expected_fields.append(f"Bullet Point {i} Accuracy?")
-        self.expected_fields.extend([
-            "Description Actual", "Description Accuracy?",
-        ])
+        self.expected_fields = list(EXPECTED_FIELDS)
+        self._normalized_expected = NORMALIZED_FIELDS
+        self._row_template = dict.fromkeys(self.expected_fields, "") # Empty row, copied per loaded CSV row
 
         self.existing_data = []
         self.url_to_row_index = {}
+        self._loaded_digest = None # Digest of existing_data as loaded, None if the CSV must be (re)written
+
+    @staticmethod
+    def _rows_digest(rows: List[Dict[str, str]]) -> bytes:
+        return hashlib.blake2b(repr(rows).encode('utf-8')).digest()
 
     def _load_urls_from_file(self) -> Dict[str, str]:
         """Load URLs from links.txt, mapping linkX to URL."""
@@ -45,10 +193,7 @@ class CsvProcessor:
             if not os.path.exists(self.links_file):
                 print(f"Warning: Links file '{self.links_file}' not found during CSV init.")
                 return url_map
-            with open(self.links_file, 'r') as f: lines = f.readlines()
-            for i, line in enumerate(lines, 1):
-                url = line.strip()
-                if url: url_map[f"link{i}"] = url
+            url_map = load_url_map(self.links_file)
             print(f"CSV Processor: Loaded {len(url_map)} URLs from {self.links_file}")
             return url_map
         except Exception as e:
@@ -59,105 +204,64 @@ class CsvProcessor:
         """Loads data from the existing CSV file if it exists."""
         self.existing_data = []
         self.url_to_row_index = {}
+        self._loaded_digest = None
         if not os.path.exists(self.csv_filename):
             print(f"CSV file '{self.csv_filename}' not found. Will create a new one.")
             return
 
         try:
-            with open(self.csv_filename, 'r', newline='', encoding='utf-8-sig') as csvfile:
+            with open(self.csv_filename, 'r', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
                 reader = csv.DictReader(csvfile)
                 # Handle potentially missing columns gracefully when loading
                 loaded_fieldnames = reader.fieldnames or []
                 processed_rows = []
-                for row in reader:
+                # Rows and the URL -> row index map are built in the same pass; hot names bound to locals
+                append, url_map = processed_rows.append, self.url_to_row_index
+                template = self._row_template
+                template_keys = template.keys()
+                for idx, row in enumerate(reader):
                      # Ensure row has all expected fields, adding missing ones as empty strings
-                     complete_row = {field: row.get(field, "") for field in self.expected_fields}
-                     processed_rows.append(complete_row)
+                     complete_row = template.copy()
+                     complete_row.update((k, row[k]) for k in row.keys() & template_keys)
+                     append(complete_row)
+                     link = complete_row["Link"].strip()
+                     if link:
+                         url_map[link] = idx
 
                 self.existing_data = processed_rows
+                # Only trust the digest if the file already has exactly our columns; otherwise a rewrite is a real change
+                if loaded_fieldnames == self.expected_fields:
+                    self._loaded_digest = self._rows_digest(self.existing_data)
                 print(f"Loaded {len(self.existing_data)} rows from existing CSV: {self.csv_filename}")
-
-                # Map URL to row index
-                for idx, row in enumerate(self.existing_data):
-                    link = row.get("Link", "").strip()
-                    if link:
-                        self.url_to_row_index[link] = idx
         except Exception as e:
             print(f"Error reading existing CSV file '{self.csv_filename}': {str(e)}")
             print("Will proceed assuming an empty or new CSV.")
             self.existing_data = []
             self.url_to_row_index = {}
-
-    def _parse_analysis_file(self, file_path: str, file_name: str) -> Optional[Dict[str, str]]:
-        """
-        Parse an analysis file (e.g., link1_homedepot_analysis.txt) and extract field values.
-        Uses the base link ID (linkX) to set the Link field from url_map.
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
-
-            parsed_data = {field: "" for field in self.expected_fields}
-
-            # Extract base link ID (linkX) from file name
-            match = re.match(r'(link\d+)_(\w+)_analysis\.txt$', file_name)
-            base_product_id = match.group(1) if match else None # e.g., link1
-            # retailer_name = match.group(2) if match else "Unknown"
-
-            # Use regex to find **Field:** Value pairs
-            pattern = re.compile(r'\*\*(.*?):\*\*\s*(.*?)(?=\*\*[a-zA-Z0-9\s\+\?\#\(\)]+:\*\*|\Z)', re.DOTALL | re.IGNORECASE)
-            matches = pattern.findall(content)
-
-            found_values = {}
-            for match_item in matches:
-                 field_name_raw = match_item[0].strip()
-                 field_value = match_item[1].strip()
-                 normalized_name = ' '.join(field_name_raw.split())
-                 found_values[normalized_name] = field_value
-
-            # Populate parsed_data
-            for field in self.expected_fields:
-                value = ""
-                found = False
-                for found_field, found_val in found_values.items():
-                    if re.sub(r'\s+', ' ', found_field).lower() == re.sub(r'\s+', ' ', field).lower():
-                        value = found_val
-                        found = True
-                        break
-                parsed_data[field] = value
-
-            if base_product_id and base_product_id in self.url_map:
-                parsed_data["Link"] = self.url_map[base_product_id]
-                # print(f"  CSV Parser: Set Link for {base_product_id} from map.") # Debug
-            elif not parsed_data.get("Link"):
-                 # If Link wasn't in the analysis file AND not in map, log warning
-                 print(f"  CSV Parser Warning: Could not determine Link for {file_name}.")
-            # Retailer should already be correctly set by gemini_processor
-
-            return parsed_data
-
-        except FileNotFoundError:
-             print(f"Error: Analysis file not found: {file_path}")
-             return None
-        except Exception as e:
-            print(f"Error parsing {file_path}: {str(e)}")
-            # Return fallback data with Link if possible
-            empty_data = {field: "" for field in self.expected_fields}
-            if base_product_id and base_product_id in self.url_map:
-                empty_data["Link"] = self.url_map[base_product_id]
-            # Try to extract retailer from filename as fallback
-            if match:
-                 retailer_name = match.group(2).capitalize()
-                 if retailer_name == "Homedepot": retailer_name = "Home Depot"
-                 empty_data["Retailer"] = retailer_name
-            return empty_data
+            self._loaded_digest = None
+
+    def _parse_analysis_file(self, file_path: str, file_name: str, fields: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """Parse one analysis file against this processor's URL map and field list."""
+        return _parse_analysis_file(file_path, file_name, self.url_map, self._normalized_expected, fields)
+
+    def _parse_files(self, files: List[str]) -> List[Optional[Dict[str, str]]]:
+        """Parse analysis files, in order. Empty files are not read."""
+        results = []
+        for name in files:
+            path = os.path.join(self.output_folder, name)
+            fields = None
+            try:
+                if os.stat(path).st_size == 0:
+                    fields = dict.fromkeys(self.expected_fields, "") # Nothing to read (e.g. an interrupted write)
+            except OSError: pass # Left to _parse_analysis_file to report
+            results.append(self._parse_analysis_file(path, name, fields))
+        return results
 
     def process_all_analyses(self, print_summary=False, selected_indices: Optional[List[int]] = None):
         """
         Process analysis files (e.g., link1_homedepot_analysis.txt) and output/update CSV.
         Handles selective updates based on selected_indices (matching link number).
         """
-        from core.reporting_utils import report
-
         if not os.path.exists(self.output_folder):
             print(f"Error: Output folder '{self.output_folder}' does not exist.")
             report.fail_product("CSV Gen Error", f"Output folder '{self.output_folder}' does not exist.")
@@ -166,32 +270,34 @@ class CsvProcessor:
         self._load_existing_csv() # Load current CSV state
 
         # Regex to find analysis files like link1_homedepot_analysis.txt
+        # One directory scan and one regex match per entry; the (name, match) pairs are reused below
         analysis_file_pattern = re.compile(r'(link\d+_(\w+))_analysis\.txt$')
-        all_analysis_files = [f for f in os.listdir(self.output_folder) if analysis_file_pattern.match(f)]
+        with os.scandir(self.output_folder) as it:
+            all_analysis = [(e.name, m) for e in it for m in (analysis_file_pattern.match(e.name),) if m and e.is_file()]
 
-        files_to_process = []
+        selected_analysis = []
         processed_base_ids = set() # Track which base linkX have been processed
 
         if selected_indices:
             print(f"CSV Processing: Selecting analysis files for indices: {selected_indices}")
             selected_base_ids = {f"link{i}" for i in selected_indices}
-            for f in all_analysis_files:
-                match = analysis_file_pattern.match(f)
-                if match:
-                    base_id_match = re.match(r'(link\d+)', match.group(1))
-                    if base_id_match:
-                        base_id = base_id_match.group(1)
-                        if base_id in selected_base_ids:
-                            files_to_process.append(f)
-                            processed_base_ids.add(base_id)
-
-            missing_indices = set(selected_indices) - {int(re.search(r'\d+', bid).group()) for bid in processed_base_ids}
+            for f, match in all_analysis:
+                base_id = match.group(1).split('_', 1)[0]
+                if base_id in selected_base_ids:
+                    selected_analysis.append((f, match))
+                    processed_base_ids.add(base_id)
+
+            missing_indices = set(selected_indices) - {int(bid[4:]) for bid in processed_base_ids} # "link12" -> 12
             if missing_indices:
                 print(f"Warning: No analysis files found for selected indices: {sorted(list(missing_indices))}")
 
         else:
             print("CSV Processing: Processing all found analysis files.")
-            files_to_process = all_analysis_files
+            selected_analysis = all_analysis
+
+        # Sort files numerically based on link number, taken from the match already made (one int() per file)
+        keyed = sorted((int(match.group(1).split('_', 1)[0][4:]), f) for f, match in selected_analysis)
+        files_to_process = [f for _, f in keyed]
 
         if not files_to_process:
             if selected_indices:
@@ -206,14 +312,10 @@ class CsvProcessor:
         updated_rows = 0
         added_rows = 0
 
-        # Sort files numerically based on link number
-        files_to_process.sort(key=lambda f: int(re.search(r'link(\d+)', f).group(1)) if re.search(r'link(\d+)', f) else 0)
-
-        for file in files_to_process:
-            file_path = os.path.join(self.output_folder, file)
-            print(f"Processing '{file}' for CSV...")
+        parsed_results = self._parse_files(files_to_process)
 
-            parsed_data = self._parse_analysis_file(file_path, file)
+        for file, parsed_data in zip(files_to_process, parsed_results):
+            if self.verbose: print(f"Processing '{file}' for CSV...")
 
             if parsed_data is None:
                 print(f"  Skipping {file} due to critical parsing error.")
@@ -231,23 +333,16 @@ class CsvProcessor:
 
             # Update or Add Row based on Link URL
             if link_url in self.url_to_row_index:
-                row_index = self.url_to_row_index[link_url]
-                for field in self.expected_fields:
-                    if field in self.existing_data[row_index]:
-                         self.existing_data[row_index][field] = parsed_data.get(field, self.existing_data[row_index][field]) # Update with parsed value or keep old if parse failed for field
-                    else:
-                         self.existing_data[row_index][field] = parsed_data.get(field, "")
-                # Ensure all expected fields exist
-                for field in self.expected_fields:
-                    if field not in self.existing_data[row_index]:
-                        self.existing_data[row_index][field] = parsed_data.get(field, "")
-                print(f"  Updated existing row for URL: {link_url}")
+                row = self.existing_data[self.url_to_row_index[link_url]]
+                # Update with parsed value, keeping the old one if the field was not parsed; also fills any missing fields
+                row.update({field: parsed_data.get(field, row.get(field, "")) for field in self.expected_fields})
+                if self.verbose: print(f"  Updated existing row for URL: {link_url}")
                 updated_rows += 1
             else:
                 new_row_data = {field: parsed_data.get(field, "") for field in self.expected_fields}
                 self.existing_data.append(new_row_data)
                 self.url_to_row_index[link_url] = len(self.existing_data) - 1
-                print(f"  Added new row for URL: {link_url}")
+                if self.verbose: print(f"  Added new row for URL: {link_url}")
                 added_rows += 1
 
         # Write the final data back to CSV
@@ -255,17 +350,30 @@ class CsvProcessor:
              print("No files were successfully processed to update the CSV.")
              return True
 
+        if self._loaded_digest is not None and self._rows_digest(self.existing_data) == self._loaded_digest:
+            print(f"\nCSV content unchanged ({processed_files_count} files processed); skipping rewrite of {self.csv_filename}")
+            return True
+
         try:
             print(f"\nWriting {len(self.existing_data)} total rows to CSV: {self.csv_filename} ({updated_rows} updated, {added_rows} added based on this run)")
             backup_filename = self.csv_filename + ".bak"
             if os.path.exists(self.csv_filename):
-                 try: shutil.copy2(self.csv_filename, backup_filename); print(f"  Created backup: {backup_filename}")
+                 # The CSV is only ever replaced, never rewritten in place, so linking the old file is a safe O(1) backup
+                 try: _link_or_copy(self.csv_filename, backup_filename); print(f"  Created backup: {backup_filename}")
                  except Exception as bk_err: print(f"  Warning: Could not create CSV backup: {bk_err}")
 
-            with open(self.csv_filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=self.expected_fields, extrasaction='ignore')
-                writer.writeheader()
-                writer.writerows(self.existing_data)
+            tmp_filename = self.csv_filename + ".tmp"
+            with open(tmp_filename, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
+                # Serialize rows to lists in column order once; csv.writer avoids DictWriter's per-cell lookups
+                writer = csv.writer(csvfile)
+                writer.writerow(self.expected_fields)
+                rows = self.existing_data
+                for start in range(0, len(rows), _CSV_WRITE_BATCH):
+                    # Bounded batches keep only one slice of serialized rows in memory at a time
+                    writer.writerows([[row.get(field, "") for field in self.expected_fields] for row in rows[start:start + _CSV_WRITE_BATCH]])
+                    csvfile.flush()
+                csvfile.flush(); os.fsync(csvfile.fileno()) # Make the new CSV durable before it is snapshotted
+            os.replace(tmp_filename, self.csv_filename) # New inode: earlier links (backup, report snapshots) keep their content
 
             print(f"Successfully updated/created CSV file: {self.csv_filename}")
 
@@ -277,13 +385,15 @@ class CsvProcessor:
             selection_tag = f"_selection_{'_'.join(map(str, selected_indices))}" if selected_indices else ""
             csv_report_filename = f"{base_csv_name}{selection_tag}_{timestamp}.csv"
             csv_report_path = os.path.join(report_folder, csv_report_filename)
-            shutil.copy2(self.csv_filename, csv_report_path)
+            _link_or_copy(self.csv_filename, csv_report_path)
             print(f"CSV file also saved to: {csv_report_path}")
 
             return True
         except Exception as e:
             print(f"Error writing CSV file '{self.csv_filename}': {str(e)}")
             report.fail_product("CSV Write Error", f"Failed to write CSV: {e}")
+            try: os.remove(self.csv_filename + ".tmp")
+            except OSError: pass
             if os.path.exists(backup_filename):
                  try: shutil.move(backup_filename, self.csv_filename); print(f"  Restored CSV from backup: {backup_filename}")
                  except Exception as restore_err: print(f"  FATAL: Could not restore CSV from backup: {restore_err}")
@@ -296,7 +406,8 @@ def add_csv_output(
     csv_filename="audit_results.csv",
     links_file="links.txt",
     print_summary=False,
-    selected_indices: Optional[List[int]] = None # Add selected_indices
+    selected_indices: Optional[List[int]] = None, # Add selected_indices
+    verbose=False
 ):
     """
     Process analysis files and output/update a CSV file. Now handles retailer suffixes in filenames.
@@ -307,12 +418,11 @@ def add_csv_output(
         links_file: Path to the file containing product URLs (one per line)
         print_summary: Whether to print and save report summary at the end (handled by main now)
         selected_indices: List of 1-based link indices to process. If None, process all.
+        verbose: Print a progress line for every analysis file and row
 
     Returns:
         bool: Whether processing was successful
     """
-    from core.reporting_utils import report
-
     print(f"\n{'='*80}")
     print(f"GENERATING/UPDATING CSV FILE: {os.path.join(output_folder, csv_filename)}")
     if selected_indices: print(f"Processing selection: {selected_indices}")
@@ -320,7 +430,7 @@ def add_csv_output(
 
     try:
         # Instantiate with the base CSV filename relative to the output folder
-        processor = CsvProcessor(output_folder, os.path.basename(csv_filename), links_file)
+        processor = CsvProcessor(output_folder, os.path.basename(csv_filename), links_file, verbose=verbose)
         success = processor.process_all_analyses(print_summary=False, selected_indices=selected_indices)
         return success
     except Exception as e:
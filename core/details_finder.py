@@ -1,6 +1,47 @@
 import time
 import random
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+
+# More precise selectors for the Product Details button, in priority order
+DETAIL_SELECTORS = [
+    "//button[text()='Product Details']",  # Exact text match
+    "//button[normalize-space(text())='Product Details']",  # Normalized text
+    "//button[contains(@class, 'detail') and not(contains(@class, 'list'))]",  # Has detail in class but not list
+    "//button[@aria-label='Product Details']",  # Exact aria-label
+    "//span[text()='Product Details']/parent::button",  # Text in child span
+    "//span[contains(text(), 'Specifications')]/parent::button",  # Sometimes labeled as Specifications
+    "//button[contains(@data-id, 'detail')]",  # Detail in data-id
+    "//a[text()='View More Details']",  # Link with exact text
+    "//div[contains(@class, 'accordion-title') and contains(text(), 'Details')]",  # Accordion style
+    "//div[contains(text(), 'Product Details')]",  # Div with text
+    "//p[contains(text(), 'Product Details')]",  # Paragraph with text
+    "//a[contains(text(), 'Product Details')]"  # Link with text
+]
+
+def union_xpath(selectors):
+    """One XPath matching what any of selectors matches, so one WebDriver round trip tells whether any of them matches yet."""
+    return " | ".join(selectors)
+
+DETAIL_UNION_XPATH = union_xpath(DETAIL_SELECTORS)
+
+# Waits below poll nodes the page may re-render meanwhile; a stale node just means "poll again"
+_WAIT_IGNORED = (StaleElementReferenceException,)
+
+def _is_detail_candidate(element):
+    """Whether an element is displayed and not an "Add to" cart/list control."""
+    if not element.is_displayed(): return False
+    element_text = element.text.lower() if element.text else ""
+    return 'add to' not in element_text and 'cart' not in element_text and 'list' not in element_text
+
+def _any_detail_visible(driver):
+    """WebDriverWait condition: some element matching DETAIL_SELECTORS would be accepted by the selector loop."""
+    return any(_is_detail_candidate(el) for el in driver.find_elements(By.XPATH, DETAIL_UNION_XPATH))
+
+def _in_viewport(driver, element):
+    """WebDriverWait condition: the element's top edge is inside the viewport (a smooth scroll has arrived)."""
+    return driver.execute_script("const top = arguments[0].getBoundingClientRect().top; return top >= 0 && top < window.innerHeight;", element)
 
 def find_product_details_button(driver):
     """
@@ -22,41 +63,22 @@ def find_product_details_button(driver):
     max_scroll_attempts = 20  # More attempts with smaller increments
     scroll_attempts = 0
     
-    # More precise selectors for the Product Details button
-    detail_selectors = [
-        "//button[text()='Product Details']",  # Exact text match
-        "//button[normalize-space(text())='Product Details']",  # Normalized text
-        "//button[contains(@class, 'detail') and not(contains(@class, 'list'))]",  # Has detail in class but not list
-        "//button[@aria-label='Product Details']",  # Exact aria-label
-        "//span[text()='Product Details']/parent::button",  # Text in child span
-        "//span[contains(text(), 'Specifications')]/parent::button",  # Sometimes labeled as Specifications
-        "//button[contains(@data-id, 'detail')]",  # Detail in data-id
-        "//a[text()='View More Details']",  # Link with exact text
-        "//div[contains(@class, 'accordion-title') and contains(text(), 'Details')]",  # Accordion style
-        "//div[contains(text(), 'Product Details')]",  # Div with text
-        "//p[contains(text(), 'Product Details')]",  # Paragraph with text
-        "//a[contains(text(), 'Product Details')]"  # Link with text
-    ]
-    
     # Use smaller scroll increments (300px instead of 800px)
     scroll_increment = 300
     
     while not found_details_button and scroll_attempts < max_scroll_attempts and current_position < total_height:
         # Look for Detail elements with exact matching to avoid Add to List
-        for selector in detail_selectors:
+        for selector in DETAIL_SELECTORS:
             try:
                 elements = driver.find_elements(By.XPATH, selector)
                 for element in elements:
-                    # Check if it's visible
-                    if element.is_displayed():
-                        # Double check it's not an "Add to" button
-                        element_text = element.text.lower() if element.text else ""
-                        if 'add to' not in element_text and 'cart' not in element_text and 'list' not in element_text:
-                            # Found the Product Details button
-                            details_button = element
-                            found_details_button = True
-                            print(f"Found Product Details button with text: '{element.text}'")
-                            break
+                    # Visible, and not an "Add to" button
+                    if _is_detail_candidate(element):
+                        # Found the Product Details button
+                        details_button = element
+                        found_details_button = True
+                        print(f"Found Product Details button with text: '{element.text}'")
+                        break
             except Exception as e:
                 continue
                 
@@ -75,8 +97,9 @@ def find_product_details_button(driver):
         driver.execute_script(f"window.scrollTo(0, {current_position});")
         print(f"Scrolled to position {current_position}/{total_height} (attempt {scroll_attempts})")
         
-        # Wait three seconds between scrolls for elements to load
-        time.sleep(3)
+        # Wait up to three seconds between scrolls for elements to load, moving on as soon as an acceptable candidate is visible
+        try: WebDriverWait(driver, 3, poll_frequency=0.25, ignored_exceptions=_WAIT_IGNORED).until(_any_detail_visible)
+        except TimeoutException: pass
         
     return found_details_button, details_button, total_height
 
@@ -126,7 +149,8 @@ def click_details_button(driver, found_button, button_element, total_height):
                     if link.is_displayed():
                         print("Found 'View More Details' link")
                         driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", link)
-                        time.sleep(2)
+                        try: WebDriverWait(driver, 2, poll_frequency=0.2, ignored_exceptions=_WAIT_IGNORED).until(lambda d: _in_viewport(d, link))
+                        except TimeoutException: pass
                         driver.execute_script("arguments[0].click();", link)
                         print("Clicked 'View More Details' link")
                         time.sleep(3)
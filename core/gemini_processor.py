@@ -4,21 +4,64 @@ import json
 import re
 import google.generativeai as genai
 from typing import Dict, List, Optional, Tuple
-import base64
+import asyncio
+import hashlib
+import random
+import shutil
 import sys
+import threading
+import time
+from collections import defaultdict
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
+from google.generativeai import caching
+from google.api_core import exceptions as google_exceptions
+
+# A model with context caching support, so each retailer prompt is tokenized/billed once per cache lifetime
+MODEL_NAME = 'models/gemini-2.5-flash'
+PROMPT_CACHE_TTL = timedelta(minutes=10)
+PROMPT_CACHE_REFRESH_MARGIN = timedelta(minutes=2) # Extend the TTL when less than this remains
+# "**Field:** value" pairs in a response; a value runs until the next bold field heading
+_FIELD_RE = re.compile(r'\*\*(.*?):\*\*\s*(.*?)(?=\*\*[a-zA-Z0-9\s\+\?\#\(\)]+:\*\*|\Z)', re.DOTALL)
+_WS_RE = re.compile(r'\s+')
+_ID_RE = re.compile(r'(link\d+)_(\w+)') # Product ID with retailer, e.g. link1_homedepot
+_PNG_RE = re.compile(r'(link(\d+)_(\w+))\.png$') # Matches linkX_retailer.png
+
+INLINE_IMAGE_MAX_BYTES = 15 * 1024 * 1024 # Larger screenshots go through the File API (inline requests are capped at 20 MB)
+RESULT_CACHE_DIR = ".gemini_cache" # Under the output folder: cached analyses plus cache_index.json
+# Part of every result-cache key: bump when the request layout or response formatting changes so cached analyses are redone
+RESULT_FORMAT_VERSION = 2
+GEMINI_CONCURRENCY = 12 # Default number of Gemini requests in flight at once
+GEMINI_MAX_RETRIES = 5 # Retries of a rate-limited (429 ResourceExhausted) request before it is reported as failed
+GEMINI_RETRY_BASE_DELAY = 2.0 # Seconds before the first retry; doubled (with jitter) on each further retry
+
+SAFETY_SETTINGS = [
+    {"category": c, "threshold": "BLOCK_NONE"} for c in [
+        "HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"
+    ]
+]
 
 class GeminiProcessor:
     """
-    Process product data using Google's Gemini 1.5 Pro API.
+    Process product data using Google's Gemini API.
     Determines retailer from filename to select appropriate prompt.
+    Retailer prompts are held in Gemini context caches; the plain model is used when caching is unavailable.
+
+    Create one processor per run and send every request through it: genai.configure (called here)
+    resets the SDK's client cache, after which all sync and async calls share one client and channel,
+    so concurrent requests are multiplexed over a single connection instead of each paying a TLS handshake.
     """
 
     def __init__(self, api_key: str):
         self.api_key = api_key
         genai.configure(api_key=self.api_key)
         self.prompt_cache = {} # Cache for loaded prompts
+        self.cache_by_retailer = {} # retailer -> CachedContent, or None if caching failed for that prompt
+        self._cache_lock = threading.Lock() # Requests are built on executor threads; create each cache once
+        self.model_by_retailer = {} # retailer -> model with the prompt as system instruction, used when it is not cached
         try:
-            self.model = genai.GenerativeModel('models/gemini-1.5-flash-001')
+            self.model = genai.GenerativeModel(MODEL_NAME)
             print(f"Initialized Gemini Model: {self.model.model_name}")
         except Exception as model_init_error:
              print(f"FATAL: Failed to initialize Gemini model: {model_init_error}")
@@ -32,6 +75,10 @@ class GeminiProcessor:
         for i in range(1, 10):
             self.expected_fields.extend([f"Bullet Point {i} Actual", f"Bullet Point {i} Accuracy?"])
         self.expected_fields.extend(["Description Actual", "Description Accuracy?"])
+        self._expected_pairs = [(f, _WS_RE.sub(' ', f).lower()) for f in self.expected_fields] # (field, normalized name)
+        # Formatted analysis as one template plus a getter for its values, both built once per field list
+        self._response_template = "\n".join(f"**{f.replace('{', '{{').replace('}', '}}')}:** {{}}" for f in self.expected_fields)
+        self._response_values = itemgetter(*(key for _, key in self._expected_pairs))
 
         self.url_map = self._load_urls()
         self.links_file_path = "links.txt"
@@ -64,16 +111,61 @@ class GeminiProcessor:
             self.prompt_cache[prompt_path] = self._read_text_file(prompt_path)
         return self.prompt_cache[prompt_path]
 
-    def _encode_image(self, image_path: str) -> str:
-        """Encode an image file to base64."""
+    def _get_cached_model(self, retailer_name: str, prompt_text: str) -> Optional[genai.GenerativeModel]:
+        """
+        Model bound to a context cache holding the retailer prompt, created on first use and
+        kept alive while products are processed. Returns None if the prompt cannot be cached
+        (e.g. below the model's minimum cacheable size); _get_uncached_model is used instead.
+        """
+        with self._cache_lock:
+            if retailer_name in self.cache_by_retailer and self.cache_by_retailer[retailer_name] is None:
+                return None
+            cached = self.cache_by_retailer.get(retailer_name)
+            try:
+                if cached is None:
+                    cached = caching.CachedContent.create(
+                        model=MODEL_NAME, display_name=f"audit_prompt_{retailer_name}",
+                        system_instruction=prompt_text, ttl=PROMPT_CACHE_TTL)
+                    self.cache_by_retailer[retailer_name] = cached
+                    print(f"  Created Gemini context cache for {retailer_name} prompt (expires {cached.expire_time})")
+                elif cached.expire_time - datetime.now(timezone.utc) < PROMPT_CACHE_REFRESH_MARGIN:
+                    cached.update(ttl=PROMPT_CACHE_TTL)
+                return genai.GenerativeModel.from_cached_content(cached_content=cached)
+            except Exception as cache_err:
+                print(f"  Warning: Gemini context cache unavailable for {retailer_name} ({cache_err}); sending prompt uncached.")
+                self.cache_by_retailer[retailer_name] = None
+                return None
+
+    def _get_uncached_model(self, retailer_name: str, prompt_text: str) -> genai.GenerativeModel:
+        """
+        Model with the retailer prompt as its system instruction, as in the context cache,
+        so the model sees the same input whether or not the prompt could be cached.
+        """
+        with self._cache_lock:
+            model = self.model_by_retailer.get(retailer_name)
+            if model is None:
+                model = self.model_by_retailer[retailer_name] = genai.GenerativeModel(MODEL_NAME, system_instruction=prompt_text)
+            return model
+
+    def close(self):
+        """Delete the context caches created by this processor (they would otherwise live until their TTL)."""
+        for retailer_name, cached in list(self.cache_by_retailer.items()):
+            if cached is None: continue
+            try: cached.delete()
+            except Exception as del_err: print(f"  Warning: Could not delete Gemini context cache for {retailer_name}: {del_err}")
+        self.cache_by_retailer.clear()
+
+    def _read_image(self, image_path: str) -> Optional[bytes]:
+        """PNG bytes to send inline, or None for screenshots too large to send inline (uploaded instead)."""
         try:
+            if os.path.getsize(image_path) > INLINE_IMAGE_MAX_BYTES: return None
             with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+                return image_file.read()
         except FileNotFoundError:
-            print(f"Error: Image file not found for encoding: {image_path}")
+            print(f"Error: Image file not found for reading: {image_path}")
             raise
         except Exception as e:
-             print(f"Error encoding image {image_path}: {e}")
+             print(f"Error reading image {image_path}: {e}")
              raise
 
     def _read_text_file(self, text_path: str) -> str:
@@ -90,33 +182,128 @@ class GeminiProcessor:
 
     def _format_direct_response(self, response_text: str, product_id_with_retailer: str) -> str:
         """Formats response, ensuring all fields and correct Link/Retailer."""
-        match = re.match(r'(link\d+)_(\w+)', product_id_with_retailer)
+        match = _ID_RE.match(product_id_with_retailer)
         base_product_id = match.group(1) if match else None
         retailer_name = match.group(2) if match else "Unknown"
         retailer_display_name = "Home Depot" if retailer_name.lower() == "homedepot" else retailer_name.capitalize()
 
-        result_lines = []
-        field_values_from_response = {}
-        pattern = re.compile(r'\*\*(.*?):\*\*\s*(.*?)(?=\*\*[a-zA-Z0-9\s\+\?\#\(\)]+:\*\*|\Z)', re.DOTALL | re.IGNORECASE)
-        matches = pattern.findall(response_text)
-        for match_item in matches:
-             field_name = match_item[0].strip()
-             field_value = match_item[1].strip()
-             normalized_name = ' '.join(field_name.split())
-             field_values_from_response[normalized_name] = field_value
-
-        for field in self.expected_fields:
-            value = "" ; found = False
-            for resp_field, resp_val in field_values_from_response.items():
-                 if re.sub(r'\s+', ' ', resp_field).lower() == re.sub(r'\s+', ' ', field).lower():
-                     value = resp_val ; found = True ; break
-            if not found: value = ""
-
-            if field == "Link": value = self.url_map.get(base_product_id, "") if base_product_id else ""
-            elif field == "Retailer": value = retailer_display_name
-
-            result_lines.append(f"**{field}:** {value}")
-        return "\n".join(result_lines)
+        # Response fields keyed by normalized name, so each expected field is a single lookup
+        resp_map = {_WS_RE.sub(' ', name.strip()).lower(): value.strip() for name, value in _FIELD_RE.findall(response_text)}
+        resp_map = defaultdict(str, resp_map) # Fields missing from the response format as empty
+        # Link and Retailer always come from links.txt / the file name, never from the response
+        resp_map["link"] = self.url_map.get(base_product_id, "") if base_product_id else ""
+        resp_map["retailer"] = retailer_display_name
+
+        return self._response_template.format(*self._response_values(resp_map))
+
+    def _invalid_id_response(self, product_id_with_retailer: str) -> Optional[str]:
+        """Fallback response if the product ID does not name a retailer, else None."""
+        if _ID_RE.match(product_id_with_retailer): return None
+        error_msg = f"Could not extract retailer from product ID: {product_id_with_retailer}"
+        print(f"ERROR: {error_msg}")
+        return self._create_fallback_response(product_id_with_retailer, error_msg)
+
+    def read_inputs(self, image_path: str, text_path: str, product_id_with_retailer: str) -> Tuple[str, str, Optional[bytes]]:
+        """
+        Read everything a request needs: (retailer prompt, extracted text, inline image bytes or None).
+        Done once per product, so the result-cache key and the request share the same reads.
+        """
+        retailer_name = _ID_RE.match(product_id_with_retailer).group(2).lower() # e.g., "homedepot", "lowes"
+        prompt_path = f"prompts/prompt_{retailer_name}.txt"
+        print(f"  Using prompt file: {prompt_path}")
+        prompt_text = self._get_prompt(prompt_path) # Load/cache the correct prompt
+        return prompt_text, self._read_text_file(text_path), self._read_image(image_path)
+
+    def _build_request(self, image_path: str, product_id_with_retailer: str,
+                       inputs: Tuple[str, str, Optional[bytes]]) -> Tuple[genai.GenerativeModel, list]:
+        """Return the model to call and the request content for inputs from read_inputs."""
+        retailer_name = _ID_RE.match(product_id_with_retailer).group(2).lower()
+        prompt_text, product_text, image_bytes = inputs
+        if image_bytes is None:
+            print(f"  Uploading large image via File API: {image_path}")
+            image_part = genai.upload_file(image_path, mime_type="image/png")
+        else:
+            image_part = {"inline_data": {"mime_type": "image/png", "data": image_bytes}} # Raw bytes; the SDK handles wire encoding
+
+        # The prompt is the system instruction (held in a context cache when possible); per-product text and image follow
+        model = self._get_cached_model(retailer_name, prompt_text) or self._get_uncached_model(retailer_name, prompt_text)
+        content = [
+            {"role": "user", "parts": [
+                {"text": f"Extracted Text:\n{product_text}"},
+                image_part
+            ]}
+        ]
+        return model, content
+
+    @staticmethod
+    def _delete_upload(content: Optional[list]):
+        """Delete the File API upload in request content from _build_request, if its image was uploaded."""
+        if not content: return
+        image_part = content[0]["parts"][1]
+        if isinstance(image_part, dict): return # Sent inline
+        try: genai.delete_file(image_part.name)
+        except Exception as del_err: print(f"  Warning: Could not delete uploaded image {image_part.name}: {del_err}")
+
+    def _handle_response(self, response, text_path: str, product_id_with_retailer: str) -> str:
+        """Extract the text of a Gemini response and format it, logging the raw response on a line count mismatch."""
+        # Read the first candidate's parts directly; response.text would validate and re-join them again
+        candidates = response.candidates
+        parts = candidates[0].content.parts if candidates else []
+        response_text = parts[0].text if len(parts) == 1 else "".join(part.text for part in parts)
+        if not response_text:
+            reason = candidates[0].finish_reason if candidates else getattr(response, "prompt_feedback", None)
+            print(f"  ERROR accessing response text: no text parts (finish reason / feedback: {reason})")
+            raise ValueError(f"API call failed. No text in parts. Finish reason / feedback: {reason}. Full Response: {response}")
+
+        print(f"Response received from Gemini API for {product_id_with_retailer}")
+        formatted_response = self._format_direct_response(response_text, product_id_with_retailer)
+
+        # Verification and logging (remains the same)
+        line_count = formatted_response.count('\n') + 1
+        expected_count = len(self.expected_fields)
+        print(f"Formatted response: {line_count} lines (expected: {expected_count})")
+        if line_count != expected_count:
+            print(f"WARNING: Line count mismatch for {product_id_with_retailer}!")
+            raw_response_path = text_path.replace('.txt', '_raw_gemini_response.txt')
+            try:
+                 with open(raw_response_path, 'w', encoding='utf-8') as rf: rf.write(f"RAW:\n{response_text}\n\nFORMATTED:\n{formatted_response}")
+                 print(f"Saved raw Gemini response to: {raw_response_path}")
+            except Exception as log_err: print(f"  Error saving raw response log: {log_err}")
+
+        return formatted_response
+
+    def _error_response(self, error: Exception, product_id_with_retailer: str) -> str:
+        """Fallback response for an exception raised while processing a product."""
+        if isinstance(error, FileNotFoundError):
+            error_msg = f"Input file not found for {product_id_with_retailer}: {error}"
+        else:
+            error_msg = f"Error processing {product_id_with_retailer} with Gemini API: {str(error)}"
+        print(f"ERROR: {error_msg}")
+        return self._create_fallback_response(product_id_with_retailer, error_msg)
+
+    @staticmethod
+    def _retry_delay(attempt: int, product_id_with_retailer: str) -> float:
+        """Backoff before retry number attempt (0-based) of a rate-limited request."""
+        delay = GEMINI_RETRY_BASE_DELAY * (2 ** attempt) * (0.5 + random.random())
+        print(f"  Gemini rate limit hit for {product_id_with_retailer}; retrying in {delay:.1f}s "
+              f"({attempt + 1}/{GEMINI_MAX_RETRIES})")
+        return delay
+
+    def _generate(self, model, content, product_id_with_retailer: str):
+        """model.generate_content, retried with exponential backoff while the API is rate limiting."""
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            try: return model.generate_content(content, safety_settings=SAFETY_SETTINGS)
+            except google_exceptions.ResourceExhausted:
+                if attempt == GEMINI_MAX_RETRIES: raise
+                time.sleep(self._retry_delay(attempt, product_id_with_retailer))
+
+    async def _generate_async(self, model, content, product_id_with_retailer: str):
+        """Async _generate; the backoff sleeps without blocking other requests."""
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            try: return await model.generate_content_async(content, safety_settings=SAFETY_SETTINGS)
+            except google_exceptions.ResourceExhausted:
+                if attempt == GEMINI_MAX_RETRIES: raise
+                await asyncio.sleep(self._retry_delay(attempt, product_id_with_retailer))
 
     def process_product(self, image_path: str, text_path: str, product_id_with_retailer: str) -> str:
         """
@@ -130,99 +317,220 @@ class GeminiProcessor:
         Returns:
             Gemini's formatted analysis response or a fallback error response.
         """
-        match = re.match(r'(link\d+)_(\w+)', product_id_with_retailer)
-        if not match:
-             error_msg = f"Could not extract retailer from product ID: {product_id_with_retailer}"
-             print(f"ERROR: {error_msg}")
-             return self._create_fallback_response(product_id_with_retailer, error_msg)
+        fallback = self._invalid_id_response(product_id_with_retailer)
+        if fallback is not None: return fallback
+        content = None
+        try:
+            inputs = self.read_inputs(image_path, text_path, product_id_with_retailer)
+            model, content = self._build_request(image_path, product_id_with_retailer, inputs)
+            print(f"Calling Gemini API for {product_id_with_retailer}...")
+            response = self._generate(model, content, product_id_with_retailer)
+            return self._handle_response(response, text_path, product_id_with_retailer)
+        except Exception as e:
+            return self._error_response(e, product_id_with_retailer)
+        finally:
+            self._delete_upload(content) # Uploads would otherwise pile up in the project's File API storage
 
-        retailer_name = match.group(2).lower() # e.g., "homedepot", "lowes"
-        prompt_path = f"prompts/prompt_{retailer_name}.txt"
-        print(f"  Using prompt file: {prompt_path}")
+    async def process_product_async(self, image_path: str, text_path: str, product_id_with_retailer: str) -> str:
+        """
+        Async variant of process_product: the API call is awaited, and file reads and
+        cache setup run in the default executor so they do not hold up other requests.
+        """
+        result, _ = await self._process_product_async(image_path, text_path, product_id_with_retailer)
+        return result
 
+    async def _process_product_async(self, image_path: str, text_path: str, product_id_with_retailer: str,
+                                     inputs: Optional[Tuple[str, str, Optional[bytes]]] = None) -> Tuple[str, bool]:
+        """
+        process_product_async, also reporting whether Gemini answered (False for a fallback response).
+        Inputs already read with read_inputs can be passed in to avoid reading the files again.
+        """
+        fallback = self._invalid_id_response(product_id_with_retailer)
+        if fallback is not None: return fallback, False
+        loop = asyncio.get_running_loop()
+        content = None
         try:
-            prompt_text = self._get_prompt(prompt_path) # Load/cache the correct prompt
-            product_text = self._read_text_file(text_path)
-            image_data = self._encode_image(image_path)
-
-            content = [ # Content remains the same structure
-                {"role": "user", "parts": [
-                    {"text": f"{prompt_text}\n\nExtracted Text:\n{product_text}"},
-                    {"inline_data": {"mime_type": "image/png", "data": image_data}}
-                ]}
-            ]
-            safety_settings = [ # Safety settings remain the same
-                {"category": c, "threshold": "BLOCK_NONE"} for c in [
-                    "HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH",
-                    "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"
-                ]
-            ]
-
+            if inputs is None:
+                inputs = await loop.run_in_executor(None, self.read_inputs, image_path, text_path, product_id_with_retailer)
+            model, content = await loop.run_in_executor(None, self._build_request, image_path, product_id_with_retailer, inputs)
             print(f"Calling Gemini API for {product_id_with_retailer}...")
-            response = self.model.generate_content(content, safety_settings=safety_settings)
-
-            try: response_text = response.text
-            except Exception as resp_err:
-                 print(f"  ERROR accessing response text: {resp_err}")
-                 try:
-                     response_text = "".join(part.text for part in response.parts) if response.parts else ""
-                     if not response_text: raise ValueError("No text in parts.")
-                 except Exception as parts_err:
-                     raise ValueError(f"API call failed. No text. {parts_err}. Full Response: {response}")
-
-            print(f"Response received from Gemini API for {product_id_with_retailer}")
-            formatted_response = self._format_direct_response(response_text, product_id_with_retailer)
-
-            # Verification and logging (remains the same)
-            line_count = formatted_response.count('\n') + 1
-            expected_count = len(self.expected_fields)
-            print(f"Formatted response: {line_count} lines (expected: {expected_count})")
-            if line_count != expected_count:
-                print(f"WARNING: Line count mismatch for {product_id_with_retailer}!")
-                raw_response_path = text_path.replace('.txt', '_raw_gemini_response.txt')
-                try:
-                     with open(raw_response_path, 'w', encoding='utf-8') as rf: rf.write(f"RAW:\n{response_text}\n\nFORMATTED:\n{formatted_response}")
-                     print(f"Saved raw Gemini response to: {raw_response_path}")
-                except Exception as log_err: print(f"  Error saving raw response log: {log_err}")
-
-            return formatted_response
-
-        except FileNotFoundError as fnf_error:
-             error_msg = f"Input file not found for {product_id_with_retailer}: {fnf_error}"
-             print(f"ERROR: {error_msg}")
-             return self._create_fallback_response(product_id_with_retailer, error_msg)
+            response = await self._generate_async(model, content, product_id_with_retailer)
+            return self._handle_response(response, text_path, product_id_with_retailer), True
         except Exception as e:
-            error_msg = f"Error processing {product_id_with_retailer} with Gemini API: {str(e)}"
-            print(f"ERROR: {error_msg}")
-            return self._create_fallback_response(product_id_with_retailer, error_msg)
+            return self._error_response(e, product_id_with_retailer), False
+        finally:
+            if content: await loop.run_in_executor(None, self._delete_upload, content) # Uploads would otherwise pile up in File API storage
+
+    def input_digest(self, image_path: str, product_id_with_retailer: str, inputs: Tuple[str, str, Optional[bytes]]) -> str:
+        """
+        SHA-256 over the retailer prompt, text and image from read_inputs and the model name, plus the
+        product ID and its URL (both end up in the formatted result), RESULT_FORMAT_VERSION and the expected fields.
+        """
+        prompt_text, product_text, image_bytes = inputs
+        match = _ID_RE.match(product_id_with_retailer)
+        h = hashlib.sha256()
+        h.update(f"{product_id_with_retailer}\n{self.url_map.get(match.group(1), '') if match else ''}\n{MODEL_NAME}\n".encode('utf-8'))
+        h.update(f"{RESULT_FORMAT_VERSION}\n{json.dumps(self.expected_fields)}\n".encode('utf-8'))
+        for data in (prompt_text.encode('utf-8'), product_text.encode('utf-8')):
+            h.update(len(data).to_bytes(8, 'little')); h.update(data) # Length-prefixed so inputs cannot run together
+        if image_bytes is not None:
+            h.update(image_bytes)
+        else: # Too large to have been read into memory; hash it from disk
+            with open(image_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''): h.update(block)
+        return h.hexdigest()
 
     def _create_fallback_response(self, product_id_with_retailer: str, error_msg: str) -> str:
          """Creates a response string with empty fields, noting the error."""
-         match = re.match(r'(link\d+)_(\w+)', product_id_with_retailer)
+         match = _ID_RE.match(product_id_with_retailer)
          base_product_id = match.group(1) if match else None
          retailer_name = match.group(2) if match else "Unknown"
          retailer_display_name = "Home Depot" if retailer_name.lower() == "homedepot" else retailer_name.capitalize()
 
-         fallback_lines = []
-         for field in self.expected_fields:
-             value = ""
-             if field == "Link" and base_product_id: value = self.url_map.get(base_product_id, "")
-             elif field == "Retailer": value = retailer_display_name
-             elif field == "Description Actual": value = f"ERROR PROCESSING: {error_msg}"
-
-             fallback_lines.append(f"**{field}:** {value}")
+         values = {"Link": self.url_map.get(base_product_id, "") if base_product_id else "",
+                   "Retailer": retailer_display_name,
+                   "Description Actual": f"ERROR PROCESSING: {error_msg}"}
          print(f"Generated fallback analysis for {product_id_with_retailer} due to error: {error_msg}")
-         return "\n".join(fallback_lines)
+         return "\n".join(f"**{field}:** {values.get(field, '')}" for field in self.expected_fields)
+
+def _write_text(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f: f.write(text)
+
+def _load_result_cache(cache_dir: str) -> Dict[str, str]:
+    """Input digest -> cached analysis file name, from cache_index.json in cache_dir."""
+    index_path = os.path.join(cache_dir, "cache_index.json")
+    if not os.path.exists(index_path): return {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f: return json.load(f)
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable Gemini result cache index {index_path}: {e}")
+        return {}
+
+def _prune_result_cache(cache_dir: str, index: Dict[str, str], used_digests: set, processed_ids: set, present_ids: set):
+    """
+    Drop index entries (and their files) that can no longer be hit: earlier analyses of products processed
+    this run that were not reused, and analyses of products whose screenshots are gone.
+    Entries of products left out of this run (e.g. by selected indices) are kept.
+    """
+    for digest, cached_name in list(index.items()):
+        product_id = cached_name.rsplit('_', 1)[0] if '_' in cached_name else None # Names are <product id>_<digest>.txt
+        if digest in used_digests or (product_id in present_ids and product_id not in processed_ids): continue
+        del index[digest]
+        try: os.remove(os.path.join(cache_dir, cached_name))
+        except OSError: pass
+
+def _save_result_cache(cache_dir: str, index: Dict[str, str]):
+    index_path = os.path.join(cache_dir, "cache_index.json")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_text(index_path + ".tmp", json.dumps(index, indent=1, sort_keys=True))
+        os.replace(index_path + ".tmp", index_path)
+    except Exception as e:
+        print(f"Warning: Could not save Gemini result cache index {index_path}: {e}")
+
+async def _process_one(processor: GeminiProcessor, sem: asyncio.Semaphore, output_folder: str,
+                       product_id_with_retailer: str, png_file: str, result_cache: Optional[Dict[str, str]] = None,
+                       used_digests: Optional[set] = None):
+    """
+    Analyze one product and save its _analysis.txt; at most sem's limit run their API calls at once.
+    With a result_cache, inputs identical to an earlier successful analysis reuse that result instead of calling Gemini.
+    Digests of cache entries reused or written are added to used_digests.
+    """
+    from core.reporting_utils import report # Only called from the event loop thread, so report needs no lock
+
+    async with sem:
+        report.start_product(product_id_with_retailer)
+
+        image_path = os.path.join(output_folder, png_file)
+        text_path = image_path.replace('.png', '.txt')
+        result_path = image_path.replace('.png', '_analysis.txt')
+
+        # Base ID and URL for logging
+        base_id_match = _ID_RE.match(product_id_with_retailer)
+        base_product_id = base_id_match.group(1) if base_id_match else None
+        url = processor.url_map.get(base_product_id, "") if base_product_id else ""
+
+        print(f"\n{'='*50}")
+        print(f"Processing product: {product_id_with_retailer} ({png_file})")
+        if url: print(f"URL (from links.txt for {base_product_id}): {url}")
+        else: print(f"URL: Not found in {processor.links_file_path} for {base_product_id}")
+        print(f"{'='*50}")
+
+        try:
+            if os.path.exists(result_path):
+                try: os.remove(result_path); print(f"  Removed existing analysis file: {result_path}")
+                except OSError as rm_err: print(f"  Warning: Could not remove analysis file {result_path}: {rm_err}")
+
+            loop = asyncio.get_running_loop()
+            cache_dir = os.path.join(output_folder, RESULT_CACHE_DIR)
+            inputs = digest = None
+            if result_cache is not None:
+                def _read_and_digest():
+                    read = processor.read_inputs(image_path, text_path, product_id_with_retailer)
+                    return read, processor.input_digest(image_path, product_id_with_retailer, read)
+                try: inputs, digest = await loop.run_in_executor(None, _read_and_digest)
+                except Exception: pass # Unreadable inputs are reported through the fallback analysis below
+                cached_name = result_cache.get(digest) if digest else None
+                if cached_name and os.path.exists(os.path.join(cache_dir, cached_name)):
+                    await loop.run_in_executor(None, shutil.copyfile, os.path.join(cache_dir, cached_name), result_path)
+                    if used_digests is not None: used_digests.add(digest)
+                    print(f"  Inputs unchanged since a previous analysis; reused cached result: {cached_name}")
+                    report.pass_product(product_id_with_retailer, "reused cached analysis")
+                    return
+
+            # Call process_product - it now determines the prompt itself
+            result, answered = await processor._process_product_async(image_path, text_path, product_id_with_retailer, inputs)
+
+            print(f"\nGemini API Result Summary ({product_id_with_retailer}):")
+            print(f"{'-'*30}")
+            line_count = result.count('\n') + 1 # Counted without materializing a list of lines
+            for line in result.split('\n', 5)[:5]: print(line)
+            if line_count > 5: print("...")
+            print(f"Total lines in analysis: {line_count}")
+            print(f"{'-'*30}")
+
+            await asyncio.get_running_loop().run_in_executor(None, _write_text, result_path, result)
+            print(f"Analysis saved to: {result_path}")
+
+            if not answered:
+                # The fallback has the expected line count, but it holds no analysis
+                report.fail_product(product_id_with_retailer, "Gemini did not return an analysis (see ERROR PROCESSING in the saved file)")
+            elif line_count != len(processor.expected_fields):
+                error_msg = f"Output line count mismatch: {line_count} (expected {len(processor.expected_fields)})"
+                report.fail_product(product_id_with_retailer, error_msg)
+            else:
+                if digest: # Set only with the result cache on; fallbacks never get here, so they are retried next run
+                    cached_name = f"{product_id_with_retailer}_{digest}.txt"
+                    try:
+                        await loop.run_in_executor(None, lambda: os.makedirs(cache_dir, exist_ok=True))
+                        await loop.run_in_executor(None, _write_text, os.path.join(cache_dir, cached_name), result)
+                        result_cache[digest] = cached_name
+                        if used_digests is not None: used_digests.add(digest)
+                    except Exception as cache_err: print(f"  Warning: Could not cache analysis result: {cache_err}")
+                report.pass_product(product_id_with_retailer)
+
+        except Exception as e:
+            error_msg = f"Critical error during Gemini processing for {product_id_with_retailer}: {str(e)}"
+            print(f"ERROR: {error_msg}")
+            report.fail_product(product_id_with_retailer, error_msg)
+            if os.path.exists(result_path):
+                 try: os.remove(result_path)
+                 except OSError: pass
 
 def process_all_products(
     output_folder: str,
     api_key: str,
     print_summary: bool = False,
-    selected_indices: Optional[List[int]] = None
+    selected_indices: Optional[List[int]] = None,
+    concurrency: int = GEMINI_CONCURRENCY,
+    use_cache: bool = True
 ):
     """
     Process products in the output folder using Gemini.
     Determines retailer from filename to select appropriate prompt.
+    Products are analyzed concurrently, with up to `concurrency` API requests in flight.
+    With use_cache, products whose prompt, image and text are unchanged since a successful
+    analysis reuse that result from <output_folder>/.gemini_cache instead of calling Gemini.
     """
     from core.reporting_utils import report
 
@@ -238,31 +546,30 @@ def process_all_products(
         report.fail_product("Gemini Init", f"Failed to initialize Gemini processor: {e}")
         return
 
-    all_files = os.listdir(output_folder)
-    product_files_to_process = [] # Store tuples of (product_id_with_retailer, png_file)
-    file_pattern = re.compile(r'(link\d+_(\w+))\.png$') # Matches linkX_retailer.png
+    # One directory read; file existence checks below are set lookups instead of stat calls
+    with os.scandir(output_folder) as it:
+        all_files = {e.name for e in it if e.is_file()}
+    product_files_to_process = [] # Store tuples of (link_index, product_id_with_retailer, png_file)
 
     if selected_indices:
         print(f"Gemini analysis selected for indices: {selected_indices}")
         found_files_for_selection = []
         processed_indices = set()
         for f in all_files:
-            match = file_pattern.match(f)
+            match = _PNG_RE.match(f)
             if match:
                 product_id_with_retailer = match.group(1)
-                base_id_match = re.match(r'link(\d+)', product_id_with_retailer)
-                if base_id_match:
-                    link_index = int(base_id_match.group(1))
-                    if link_index in selected_indices:
-                        txt_file = f"{product_id_with_retailer}.txt"
-                        if os.path.exists(os.path.join(output_folder, txt_file)):
-                             found_files_for_selection.append((product_id_with_retailer, f))
-                             processed_indices.add(link_index)
-                        else:
-                             msg=f"Text file '{txt_file}' not found."
-                             print(f"WARNING: Skipping {product_id_with_retailer} (selected): {msg}")
-                             report.start_product(product_id_with_retailer)
-                             report.fail_product(product_id_with_retailer, msg)
+                link_index = int(match.group(2))
+                if link_index in selected_indices:
+                    txt_file = f"{product_id_with_retailer}.txt"
+                    if txt_file in all_files:
+                         found_files_for_selection.append((link_index, product_id_with_retailer, f))
+                         processed_indices.add(link_index)
+                    else:
+                         msg=f"Text file '{txt_file}' not found."
+                         print(f"WARNING: Skipping {product_id_with_retailer} (selected): {msg}")
+                         report.start_product(product_id_with_retailer)
+                         report.fail_product(product_id_with_retailer, msg)
         product_files_to_process = found_files_for_selection
         missing_indices = set(selected_indices) - processed_indices
         if missing_indices:
@@ -273,12 +580,12 @@ def process_all_products(
     else:
         print("Gemini analysis for all found retailer-specific products.")
         for f in all_files:
-            match = file_pattern.match(f)
+            match = _PNG_RE.match(f)
             if match:
                  product_id_with_retailer = match.group(1)
                  txt_file = f"{product_id_with_retailer}.txt"
-                 if os.path.exists(os.path.join(output_folder, txt_file)):
-                      product_files_to_process.append((product_id_with_retailer, f))
+                 if txt_file in all_files:
+                      product_files_to_process.append((int(match.group(2)), product_id_with_retailer, f))
                  else:
                       print(f"WARNING: Skipping {product_id_with_retailer}: Text file '{txt_file}' not found.")
 
@@ -287,55 +594,34 @@ def process_all_products(
         return
 
     print(f"Found {len(product_files_to_process)} product(s) to analyze.")
-    product_files_to_process.sort(key=lambda item: int(re.search(r'link(\d+)', item[0]).group(1)) if re.search(r'link(\d+)', item[0]) else 0)
-
-    for product_id_with_retailer, png_file in product_files_to_process:
-        report.start_product(product_id_with_retailer)
-
-        image_path = os.path.join(output_folder, png_file)
-        text_path = image_path.replace('.png', '.txt')
-        result_path = image_path.replace('.png', '_analysis.txt')
-
-        # Base ID and URL for logging
-        base_id_match = re.match(r'(link\d+)', product_id_with_retailer)
-        base_product_id = base_id_match.group(1) if base_id_match else None
-        url = processor.url_map.get(base_product_id, "") if base_product_id else ""
-
-        print(f"\n{'='*50}")
-        print(f"Processing product: {product_id_with_retailer} ({png_file})")
-        if url: print(f"URL (from links.txt for {base_product_id}): {url}")
-        else: print(f"URL: Not found in {processor.links_file_path} for {base_product_id}")
-        print(f"{'='*50}")
-
-        try:
-            if os.path.exists(result_path):
-                try: os.remove(result_path); print(f"  Removed existing analysis file: {result_path}")
-                except OSError as rm_err: print(f"  Warning: Could not remove analysis file {result_path}: {rm_err}")
-
-            # Call process_product - it now determines the prompt itself
-            result = processor.process_product(image_path, text_path, product_id_with_retailer)
-
-            print("\nGemini API Result Summary:")
-            print(f"{'-'*30}")
-            lines = result.split('\n')
-            for i in range(min(5, len(lines))): print(lines[i])
-            if len(lines) > 5: print("...")
-            print(f"Total lines in analysis: {len(lines)}")
-            print(f"{'-'*30}")
-
-            with open(result_path, 'w', encoding='utf-8') as f: f.write(result)
-            print(f"Analysis saved to: {result_path}")
-
-            if len(lines) != len(processor.expected_fields):
-                error_msg = f"Output line count mismatch: {len(lines)} (expected {len(processor.expected_fields)})"
+    product_files_to_process.sort(key=itemgetter(0)) # Link index parsed once per file above
+
+    cache_dir = os.path.join(output_folder, RESULT_CACHE_DIR)
+    result_cache = _load_result_cache(cache_dir) if use_cache else None
+    used_digests = set()
+
+    async def _run_all():
+        sem = asyncio.Semaphore(max(1, concurrency))
+        results = await asyncio.gather(*[_process_one(processor, sem, output_folder, product_id_with_retailer, png_file, result_cache, used_digests)
+                                         for _, product_id_with_retailer, png_file in product_files_to_process],
+                                       return_exceptions=True)
+        # Exceptions raised outside _process_one's own error handling would otherwise leave the product unreported
+        for (_, product_id_with_retailer, _), result in zip(product_files_to_process, results):
+            if isinstance(result, BaseException):
+                error_msg = f"Unhandled error during Gemini processing for {product_id_with_retailer}: {result!r}"
+                print(f"ERROR: {error_msg}")
                 report.fail_product(product_id_with_retailer, error_msg)
-            else:
-                report.pass_product(product_id_with_retailer)
 
-        except Exception as e:
-            error_msg = f"Critical error during Gemini processing for {product_id_with_retailer}: {str(e)}"
-            print(f"ERROR: {error_msg}")
-            report.fail_product(product_id_with_retailer, error_msg)
-            if os.path.exists(result_path):
-                 try: os.remove(result_path)
-                 except OSError: pass
+    print(f"Analyzing with up to {max(1, concurrency)} concurrent Gemini requests.")
+    completed = False
+    try:
+        asyncio.run(_run_all())
+        completed = True
+    finally:
+        processor.close() # Free the prompt context caches
+        if result_cache is not None:
+            if completed: # An interrupted run has not had the chance to reuse its products' entries yet
+                present_ids = {m.group(1) for m in map(_PNG_RE.match, all_files) if m}
+                _prune_result_cache(cache_dir, result_cache, used_digests,
+                                    {product_id for _, product_id, _ in product_files_to_process}, present_ids)
+            _save_result_cache(cache_dir, result_cache)
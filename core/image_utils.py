@@ -1,5 +1,17 @@
+import os
 from PIL import Image
 
+try:
+    # Optional: libvips streams the crop without decoding the whole image
+    import pyvips
+except (ImportError, OSError): # OSError: the binding is installed but the libvips library is not
+    pyvips = None
+
+def _crop_with_vips(output_filename, tmp_filename):
+    """Crop to the top 2/3 with libvips in sequential mode; rows below the crop are never decoded."""
+    img = pyvips.Image.new_from_file(output_filename, access='sequential')
+    img.crop(0, 0, img.width, img.height * 2 // 3).write_to_file(tmp_filename)
+
 def crop_screenshot(output_filename):
     """
     Crop the screenshot to remove bottom 1/3.
@@ -12,6 +24,18 @@ def crop_screenshot(output_filename):
     """
     try:
         print("Cropping screenshot to remove bottom 1/3...")
+
+        if pyvips is not None:
+            root, ext = os.path.splitext(output_filename)
+            tmp_filename = f"{root}.crop{ext}" # Same extension so libvips picks the same format
+            try:
+                _crop_with_vips(output_filename, tmp_filename)
+                os.replace(tmp_filename, output_filename)
+                print(f"Screenshot cropped to remove bottom 1/3: {output_filename}")
+                return True
+            except Exception as vips_err:
+                print(f"libvips crop failed ({vips_err}); falling back to Pillow.")
+                if os.path.exists(tmp_filename): os.remove(tmp_filename)
         
         # Open the image
         img = Image.open(output_filename)
@@ -32,4 +56,4 @@ def crop_screenshot(output_filename):
         return True
     except Exception as crop_err:
         print(f"Error cropping screenshot: {crop_err}")
-        return False
\ No newline at end of file
+        return False
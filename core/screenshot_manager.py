@@ -1,7 +1,58 @@
+import os
 import time
-import base64
+import binascii
 from selenium.webdriver.common.by import By
 
+# Document and viewport size in one WebDriver round-trip: [total_height, total_width, viewport_height, viewport_width]
+_PAGE_DIMENSIONS_JS = """
+return [Math.max(document.body.scrollHeight, document.documentElement.scrollHeight),
+        Math.max(document.body.scrollWidth, document.documentElement.scrollWidth),
+        window.innerHeight, window.innerWidth];
+"""
+
+# Scroll, then call back after two animation frames: by then the new position is laid out and painted.
+# Chrome pauses animation frames in hidden or occluded windows, so a 500 ms timer ends the wait regardless
+_SCROLL_AND_PAINT_JS = """
+const done = arguments[arguments.length - 1];
+window.scrollTo(0, arguments[0]);
+setTimeout(done, 500);
+requestAnimationFrame(() => requestAnimationFrame(() => done()));
+"""
+
+# Scroll through the page a viewport at a time so lazy-loaded content below the fold is requested, then back to the top
+# and wait (up to the budget in arguments[0] ms, plus a second for images) until the images have finished loading
+_LOAD_LAZY_CONTENT_JS = """
+const done = arguments[arguments.length - 1];
+const deadline = Date.now() + arguments[0];
+const step = Math.max(window.innerHeight, 200);
+document.querySelectorAll('img[loading="lazy"]').forEach(img => { img.loading = 'eager'; });
+let y = 0;
+function settle() {
+    if (Array.from(document.images).every(img => img.complete) || Date.now() > deadline + 1000) done();
+    else setTimeout(settle, 100);
+}
+(function next() {
+    window.scrollTo(0, y);
+    y += step;
+    const height = Math.max(document.body.scrollHeight, document.documentElement.scrollHeight);
+    if (y < height && Date.now() < deadline) setTimeout(next, 150);
+    else { window.scrollTo(0, 0); setTimeout(settle, 100); }
+})();
+"""
+# Time allowed for the lazy-load scroll pass (well under WebDriver's 30 s async script timeout)
+LAZY_LOAD_BUDGET_MS = 8000
+
+def _write_bytes(path, data):
+    """Write data through an unbuffered file descriptor (no BufferedWriter copy)."""
+    # O_BINARY matters on Windows, where descriptors otherwise translate newlines
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 def take_full_page_screenshot(driver, output_filename):
     """
     Take a full page screenshot using multiple methods, with fallbacks.
@@ -20,19 +71,23 @@ def take_full_page_screenshot(driver, output_filename):
         # This is the most reliable method for modern websites
         print("Using CDP method for full page screenshot")
         
+        # The window is not resized to the page height, so content below the fold is never in view on its own;
+        # scroll through it first so lazy-loaded images are loaded before the capture
+        try: driver.execute_async_script(_LOAD_LAZY_CONTENT_JS, LAZY_LOAD_BUDGET_MS)
+        except Exception as lazy_err: print(f"  Warning: Could not scroll through the page to load lazy content: {lazy_err}")
+        
         # Get page dimensions with CDP
         page_dimensions = driver.execute_cdp_cmd('Page.getLayoutMetrics', {})
         width = int(page_dimensions['contentSize']['width'])
         height = int(page_dimensions['contentSize']['height'])
         
-        # Set window size
-        driver.set_window_size(width, height)
-        
-        # Capture screenshot of the entire content
+        # Capture screenshot of the entire content; captureBeyondViewport renders off-screen
+        # content itself, so the window is not resized to the page height (a full-page reflow)
         screenshot_config = {
             'format': 'png',
             'fromSurface': True,
             'captureBeyondViewport': True,
+            'optimizeForSpeed': True, # Chrome 105+: skip the slow PNG compression passes
             'clip': {
                 'x': 0,
                 'y': 0,
@@ -46,8 +101,7 @@ def take_full_page_screenshot(driver, output_filename):
         screenshot_data = driver.execute_cdp_cmd('Page.captureScreenshot', screenshot_config)
         
         # Save the image
-        with open(output_filename, 'wb') as f:
-            f.write(base64.b64decode(screenshot_data['data']))
+        _write_bytes(output_filename, binascii.a2b_base64(screenshot_data['data']))
         
         print(f"CDP screenshot saved as: {output_filename}")
         return True
@@ -60,9 +114,8 @@ def take_full_page_screenshot(driver, output_filename):
             # Alternative method: Selenium Firefox approach with JS
             print("Using Firefox-style full page screenshot via JS")
             
-            # Get the entire page height
-            total_height = driver.execute_script("return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight);")
-            total_width = driver.execute_script("return Math.max(document.body.scrollWidth, document.documentElement.scrollWidth);")
+            # Get the entire page size
+            total_height, total_width, _, _ = driver.execute_script(_PAGE_DIMENSIONS_JS)
             
             # Set viewport size
             driver.set_window_size(total_width, total_height)
@@ -84,13 +137,8 @@ def take_full_page_screenshot(driver, output_filename):
                 from PIL import Image
                 import io
                 
-                # Get viewport size
-                viewport_height = driver.execute_script("return window.innerHeight")
-                viewport_width = driver.execute_script("return window.innerWidth")
-                
-                # Get total document size
-                total_height = driver.execute_script("return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight);")
-                total_width = driver.execute_script("return Math.max(document.body.scrollWidth, document.documentElement.scrollWidth);")
+                # Get total document size and viewport size
+                total_height, total_width, viewport_height, viewport_width = driver.execute_script(_PAGE_DIMENSIONS_JS)
                 
                 # Create a new blank image
                 stitched_image = Image.new('RGB', (viewport_width, total_height))
@@ -98,24 +146,20 @@ def take_full_page_screenshot(driver, output_filename):
                 # Loop through and take screenshots at different scroll positions
                 offset = 0
                 while offset < total_height:
-                    # Scroll to position
-                    driver.execute_script(f"window.scrollTo(0, {offset});")
-                    time.sleep(0.5)  # Allow time for page to render
+                    # Scroll to position and wait until the browser has painted it
+                    try:
+                        driver.execute_async_script(_SCROLL_AND_PAINT_JS, offset)
+                    except Exception:
+                        driver.execute_script(f"window.scrollTo(0, {offset});")
+                        time.sleep(0.5)  # Allow time for page to render
                     
                     # Take screenshot of current viewport
                     screenshot = driver.get_screenshot_as_png()
                     
-                    # Convert to PIL image
-                    image = Image.open(io.BytesIO(screenshot))
-                    
-                    # Calculate remaining height
-                    if offset + viewport_height > total_height:
-                        # Crop the final image portion if it's at the end
-                        scroll_height = total_height - offset
-                        cropped_image = image.crop((0, 0, viewport_width, scroll_height))
-                        stitched_image.paste(cropped_image, (0, offset))
-                    else:
-                        # Paste the full viewport
+                    # Decode straight into the stitched canvas; paste clips at the canvas edges,
+                    # so the last (partial) viewport needs no separate cropped copy
+                    # Screenshots are always PNG, so skip probing the other registered decoders
+                    with Image.open(io.BytesIO(screenshot), formats=['PNG']) as image:
                         stitched_image.paste(image, (0, offset))
                     
                     # Move down one viewport height minus a little overlap
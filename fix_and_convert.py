@@ -4,8 +4,70 @@ import argparse
 import re
 import csv
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from core.reporting_utils import report
+from core.csv_processor import EXPECTED_FIELDS, NORMALIZED_FIELDS, load_url_map, read_analysis_fields, scan_analysis_file
+
+# Product ID (e.g., "link1") at the start of an analysis file name
+LINK_RE = re.compile(r'(link\d+)')
+
+def _link_sort_key(file_name):
+    """Numeric order by link number (link2 before link10); names without one sort last."""
+    match = LINK_RE.match(file_name)
+    return (int(match.group(1)[4:]) if match else float('inf'), file_name)
+
+# "**Field:**" heading text; found inside a parsed value it means a heading was not recognised as one
+HEADING_TEXT_RE = re.compile(r'\*\*([^*\n]+?):\*\*')
+# The original whole-file split: a value runs up to the next one-word "**Field:**" heading or the end of the file
+SEPARATOR_SPLIT_RE = re.compile(r'\*\*(.*?):\*\*(.*?)(?=\*\*\w+:\*\*|$)', re.DOTALL)
+# Normalized expected field names, to spot an expected field swallowed by another value
+_NORMALIZED_NAMES = frozenset(NORMALIZED_FIELDS.values())
+
+def _swallowed_headings(found_values, expected_only=False):
+    """Heading names left inside parsed values (only expected fields' names if expected_only)."""
+    names = [' '.join(m.group(1).split()).casefold() for value in found_values.values() for m in HEADING_TEXT_RE.finditer(value)]
+    return [name for name in names if name in _NORMALIZED_NAMES] if expected_only else names
+
+# Threads reading/rewriting analysis files at once; the work is mostly file I/O, so more threads than cores pays off
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# CSV rows buffered before each writerows call
+CSV_WRITE_BATCH = 1000
+
+def _fix_one(file_path):
+    """
+    Rewrite one analysis file with every expected field on its own line, in order.
+    Returns (number of fields that were missing and written empty, whether the separator-based split was used).
+    Raises on I/O errors, and leaves the file unchanged if an expected field's heading could not be separated from another value.
+    """
+    # Read every field in one pass with the parser CsvProcessor uses (keyed by normalized field name);
+    # the resulting dict serves both the missing-field check and the rewrite
+    found_values = scan_analysis_file(file_path)
+    used_split = False
+    if _swallowed_headings(found_values):
+        # Rewriting now would blank any field whose heading ended up inside another value; use the original split instead
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        found_values = {NORMALIZED_FIELDS.get(name.strip(), name.strip()): value.strip() for name, value in SEPARATOR_SPLIT_RE.findall(content)}
+        used_split = True
+        swallowed = _swallowed_headings(found_values, expected_only=True)
+        if swallowed:
+            raise ValueError(f"could not separate the heading(s) {', '.join(sorted(set(swallowed)))} from other values; file left unchanged")
+    
+    # Check if all expected fields are present
+    missing_fields = [field for field in EXPECTED_FIELDS if NORMALIZED_FIELDS[field] not in found_values]
+    
+    # Every field on its own line, in the correct order (newline-separated with no trailing newline, as Gemini writes them)
+    lines = (f"**{field}:** {found_values.get(NORMALIZED_FIELDS[field], '')}" for field in EXPECTED_FIELDS)
+    
+    # Stream the lines to a sibling file and swap it in, so an interrupted fix never leaves a truncated file
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(next(lines))
+        f.writelines("\n" + line for line in lines)
+    os.replace(tmp_path, file_path)
+    return len(missing_fields), used_split
 
 def fix_analysis_files(folder_path, print_summary=False):
     """
@@ -18,104 +80,46 @@ def fix_analysis_files(folder_path, print_summary=False):
     # Import reporting utility
     from core.reporting_utils import report
     
-    # Define the expected fields in the correct order
-    expected_fields = [
-        "Link",
-        "Category",
-        "SKU",
-        "Retailer",
-        "Images Count",
-        "Images Visible Issues?",
-        "Video Count",
-        "Video Visible Issues?",
-        "A+ Content Type",
-        "A+ Content Accuracy?",
-        "Title Actual",
-        "Title Accuracy?",
-    ]
-    
-    # Add bullet points (up to 9)
-    for i in range(1, 10):
-        expected_fields.append(f"Bullet Point {i} Actual")
-        expected_fields.append(f"Bullet Point {i} Accuracy?")
-        
-    # Add description
-    expected_fields.extend([
-        "Description Actual",
-        "Description Accuracy?",
-    ])
-    
-    # Get all analysis text files
-    analysis_files = [f for f in os.listdir(folder_path) if f.endswith('_analysis.txt')]
+    # Get all analysis text files (one directory scan; is_file() uses the entry's cached type)
+    with os.scandir(folder_path) as it:
+        analysis_files = sorted((e.name for e in it if e.name.endswith('_analysis.txt') and e.is_file()), key=_link_sort_key)
     
     if not analysis_files:
         print(f"No analysis files found in '{folder_path}'.")
         return
     
-    # Process each analysis file
-    for file in analysis_files:
-        # Extract product ID (e.g., "link1" from "link1_analysis.txt")
-        match = re.match(r'(link\d+)', file)
-        product_id = match.group(1) if match else os.path.splitext(file)[0].replace('_analysis', '')
-        
-        # Start product processing in report
-        report.start_product(product_id)
+    # Files are independent, so they are fixed on a thread pool; results are printed and
+    # reported here, in file order, so report is only ever touched from this thread
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        futures = [executor.submit(_fix_one, os.path.join(folder_path, file)) for file in analysis_files]
         
-        try:
-            file_path = os.path.join(folder_path, file)
-            print(f"Fixing {file}...")
-            
-            # Read the content of the file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Check if all expected fields are present
-            missing_fields = []
-            for field in expected_fields:
-                if f"**{field}:**" not in content:
-                    missing_fields.append(field)
+        # Process each analysis file
+        for file, future in zip(analysis_files, futures):
+            # Extract product ID (e.g., "link1" from "link1_analysis.txt")
+            match = LINK_RE.match(file)
+            product_id = match.group(1) if match else os.path.splitext(file)[0].replace('_analysis', '')
             
-            corrected_content = content
+            # Start product processing in report
+            report.start_product(product_id)
             
-            # If fields are missing, add them at the end with empty values
-            if missing_fields:
-                print(f"  Warning: {len(missing_fields)} fields are missing. Adding empty fields...")
-                for field in missing_fields:
-                    corrected_content += f"\n**{field}:**"
-            
-            # Ensure each field is on its own line and has the correct format
-            formatted_lines = []
-            
-            # Use regex to find all field lines (including multiline values)
-            pattern = r'\*\*(.*?):\*\*(.*?)(?=\*\*\w+:\*\*|$)'
-            matches = re.findall(pattern, corrected_content, re.DOTALL)
-            
-            # Create a dictionary to store field values
-            field_values = {}
-            for match in matches:
-                field_name = match[0].strip()
-                field_value = match[1].strip()
-                field_values[field_name] = field_value
-            
-            # Ensure all fields are present in the correct order
-            for field in expected_fields:
-                value = field_values.get(field, "")
-                formatted_lines.append(f"**{field}:** {value}")
-            
-            # Join lines with newlines
-            formatted_content = "\n".join(formatted_lines)
-            
-            # Write the corrected content back to the file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(formatted_content)
-            
-            print(f"  Fixed and saved: {file_path}")
-            report.pass_product(product_id)
-            
-        except Exception as e:
-            error_msg = f"Error fixing {file}: {str(e)}"
-            print(f"  ERROR: {error_msg}")
-            report.fail_product(product_id, error_msg)
+            try:
+                file_path = os.path.join(folder_path, file)
+                print(f"Fixing {file}...")
+                missing_count, used_split = future.result()
+                if used_split:
+                    print("  Note: unrecognised heading text; parsed with the separator-based split.")
+                
+                # Missing fields were written with empty values
+                if missing_count:
+                    print(f"  Warning: {missing_count} fields are missing. Adding empty fields...")
+                
+                print(f"  Fixed and saved: {file_path}")
+                report.pass_product(product_id)
+                
+            except Exception as e:
+                error_msg = f"Error fixing {file}: {str(e)}"
+                print(f"  ERROR: {error_msg}")
+                report.fail_product(product_id, error_msg)
             
     # Only print summary if requested
     if print_summary:
@@ -132,53 +136,20 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
         links_file: Path to the file containing product URLs (one per line)
         print_summary: Whether to print and save report summary at the end
     """
-    # Define the expected fields in the correct order
-    expected_fields = [
-        "Link",
-        "Category",
-        "SKU",
-        "Retailer",
-        "Images Count",
-        "Images Visible Issues?",
-        "Video Count",
-        "Video Visible Issues?",
-        "A+ Content Type",
-        "A+ Content Accuracy?",
-        "Title Actual",
-        "Title Accuracy?",
-    ]
-    
-    # Add bullet points (up to 9)
-    for i in range(1, 10):
-        expected_fields.append(f"Bullet Point {i} Actual")
-        expected_fields.append(f"Bullet Point {i} Accuracy?")
-        
-    # Add description
-    expected_fields.extend([
-        "Description Actual",
-        "Description Accuracy?",
-    ])
-    
     # Load URLs from links.txt
     url_map = {}
     try:
         if os.path.exists(links_file):
-            with open(links_file, 'r') as f:
-                lines = f.readlines()
-                
-            for i, line in enumerate(lines, 1):
-                url = line.strip()
-                if url:
-                    url_map[f"link{i}"] = url
-                    
+            url_map = load_url_map(links_file) # Same loader (and per-process cache) as CsvProcessor
             print(f"Loaded {len(url_map)} URLs from {links_file}")
         else:
             print(f"Warning: Links file '{links_file}' not found.")
     except Exception as e:
         print(f"Error loading URLs from {links_file}: {str(e)}")
     
-    # Get all analysis text files
-    analysis_files = [f for f in os.listdir(folder_path) if f.endswith('_analysis.txt')]
+    # Get all analysis text files (one directory scan; is_file() uses the entry's cached type)
+    with os.scandir(folder_path) as it:
+        analysis_files = sorted((e.name for e in it if e.name.endswith('_analysis.txt') and e.is_file()), key=_link_sort_key)
     
     if not analysis_files:
         print(f"No analysis files found in '{folder_path}'.")
@@ -196,16 +167,24 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
     csv_report_path = os.path.join(report_folder, f"audit_results_{timestamp}.csv")
     
     # Write to both locations
+    # Files are read on a thread pool ahead of the loop below, which writes rows and reports in file order
+    executor = ThreadPoolExecutor(max_workers=IO_WORKERS)
     try:
+        pending = {file: executor.submit(read_analysis_fields, os.path.join(folder_path, file)) for file in analysis_files}
+        
         # Main output folder CSV
-        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=expected_fields)
-            writer.writeheader()
+        # Write beside the target and swap it in, so hardlinked report snapshots of the old CSV are never truncated
+        tmp_csv_path = csv_path + ".tmp"
+        with open(tmp_csv_path, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
+            # Rows are built as lists in column order and written in batches; csv.writer skips DictWriter's per-cell lookups
+            writer = csv.writer(csvfile)
+            writer.writerow(EXPECTED_FIELDS)
+            rows = []
             
             # Process each analysis file
-            for file in sorted(analysis_files):
+            for file in analysis_files:
                 # Extract product ID (e.g., "link1" from "link1_analysis.txt")
-                match = re.match(r'(link\d+)', file)
+                match = LINK_RE.match(file)
                 product_id = match.group(1) if match else os.path.splitext(file)[0].replace('_analysis', '')
                 
                 # Start product processing in report
@@ -215,31 +194,11 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
                     file_path = os.path.join(folder_path, file)
                     print(f"Processing {file} for CSV...")
                     
-                    # Extract link number from file name (e.g., "link1" from "link1_analysis.txt")
-                    link_match = re.match(r'(link\d+)', file)
-                    link_key = link_match.group(1) if link_match else None
-                    
-                    # Read the content of the file
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    # Link number from the file name match above (e.g., "link1" from "link1_analysis.txt")
+                    link_key = match.group(1) if match else None
                     
-                    # Extract field values using regex
-                    data = {}
-                    for field in expected_fields:
-                        # Skip Link field if we'll set it from url_map
-                        if field == "Link" and link_key and link_key in url_map:
-                            continue
-                            
-                        escaped_field = re.escape(field)
-                        pattern = fr'\*\*{escaped_field}:\*\*(.*?)(?=\*\*\w+:\*\*|$)'
-                        matches = re.findall(pattern, content, re.DOTALL)
-                        
-                        if matches:
-                            # Clean up the value (remove leading/trailing whitespace)
-                            value = matches[0].strip()
-                            data[field] = value
-                        else:
-                            data[field] = ""
+                    # All field values from one scan (parser shared with CsvProcessor), read on the pool
+                    data = pending[file].result()
                     
                     # Set URL from links.txt if available
                     if link_key and link_key in url_map:
@@ -252,8 +211,11 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
                     if not data.get("Link", "").strip():
                         print(f"  WARNING: No URL found for {product_id}")
                     
-                    # Write the row to the CSV
-                    writer.writerow(data)
+                    # Queue the row for the CSV
+                    rows.append([data[field] for field in EXPECTED_FIELDS])
+                    if len(rows) >= CSV_WRITE_BATCH:
+                        writer.writerows(rows)
+                        rows.clear()
                     
                     # Mark as passed in report
                     report.pass_product(product_id)
@@ -263,10 +225,13 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
                     print(f"  ERROR: {error_msg}")
                     report.fail_product(product_id, error_msg)
                     continue
+            writer.writerows(rows)
+        os.replace(tmp_csv_path, csv_path)
         
-        # Also save a copy to the audit_report folder
-        import shutil
-        shutil.copy2(csv_path, csv_report_path)
+        # Also save a copy to the audit_report folder. The CSV is only ever swapped in whole,
+        # so a hardlink is a safe zero-copy snapshot; copy where links are unsupported
+        try: os.link(csv_path, csv_report_path)
+        except OSError: shutil.copy2(csv_path, csv_report_path)
         
         print(f"CSV file created: {csv_path}")
         print(f"CSV file also saved to: {csv_report_path}")
@@ -278,6 +243,8 @@ def create_csv(folder_path, csv_filename, links_file="links.txt", print_summary=
     
     except Exception as e:
         print(f"Error creating CSV files: {str(e)}")
+    finally:
+        executor.shutdown(cancel_futures=True)
 
 def main():
     parser = argparse.ArgumentParser(description="Fix analysis files and create a CSV file")
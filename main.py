@@ -12,9 +12,10 @@ import re
 from typing import Optional, List # Added typing
 
 # Import core components
-from core.gemini_processor import process_all_products
+from core.gemini_processor import GEMINI_CONCURRENCY, process_all_products
 from core.csv_processor import add_csv_output
 from core.reporting_utils import report
+from core.browser_pool import BrowserPool
 # Import retailer auditor classes
 from retailers.homedepot import HomeDepotAuditor
 from retailers.lowes import LowesAuditor
@@ -56,6 +57,10 @@ def main():
     parser.add_argument("--csv-file", "-f", default="audit_results.csv", help="Name of the output CSV file (default: 'audit_results.csv')")
     parser.add_argument("--select", "-s", type=str, default=None, help="Select specific link numbers (1-based index) to process (e.g., 1,3,5)")
     parser.add_argument("--skip-capture", action="store_true", help="Skip the screenshot/text capture step")
+    parser.add_argument("--max-browser-uses", type=int, default=50, help="Captures served by one browser before it is restarted (default: 50, 1 = fresh browser per capture)")
+    parser.add_argument("--gemini-concurrency", type=int, default=GEMINI_CONCURRENCY, help=f"Gemini requests in flight at once during analysis (default: {GEMINI_CONCURRENCY})")
+    parser.add_argument("--no-gemini-cache", action="store_true", help="Re-analyze every product even if its inputs are unchanged since a cached analysis")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print a progress line for every file during CSV generation")
 
 
     args = parser.parse_args()
@@ -77,6 +82,8 @@ def main():
             time.sleep(args.delay)
 
         links_processed_capture = 0
+        # Links are captured one at a time, so a single pooled browser is reused between them
+        browser_pool = BrowserPool(size=1, max_uses=max(1, args.max_browser_uses), prewarm=False)
         try:
             if not os.path.exists(args.input_file):
                 raise FileNotFoundError(f"Input file '{args.input_file}' not found.")
@@ -103,9 +110,9 @@ def main():
 
                 auditor = None
                 if retailer == "homedepot":
-                    auditor = HomeDepotAuditor()
+                    auditor = HomeDepotAuditor(browser_pool)
                 elif retailer == "lowes":
-                    auditor = LowesAuditor()
+                    auditor = LowesAuditor(browser_pool)
                 else:
                     report.fail_product(product_id_with_retailer, f"Unsupported retailer '{retailer}'")
                     continue
@@ -163,6 +170,8 @@ def main():
         except Exception as e:
              print(f"An unexpected error occurred during capture phase: {e}")
              report.fail_product("Capture Error", f"Unexpected error: {e}")
+        finally:
+            browser_pool.close()
 
 
     # --- Gemini Analysis Step ---
@@ -177,7 +186,9 @@ def main():
                 args.output_folder,
                 api_key=api_key,
                 print_summary=False,
-                selected_indices=selected_indices
+                selected_indices=selected_indices,
+                concurrency=args.gemini_concurrency,
+                use_cache=not args.no_gemini_cache
             )
             print("\nAnalysis complete!")
 
@@ -189,7 +200,8 @@ def main():
             args.csv_file,
             args.input_file,
             print_summary=False,
-            selected_indices=selected_indices
+            selected_indices=selected_indices,
+            verbose=args.verbose
         )
         print("\nCSV processing complete!")
 
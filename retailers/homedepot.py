@@ -6,12 +6,13 @@ from selenium.webdriver.common.by import By
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from typing import Tuple # Added for type hinting
+from typing import Optional, Tuple # Added for type hinting
 
 # Import core functions
-from core.browser_setup import setup_browser
+from core.browser_pool import BrowserPool, borrowed_browser
 from core.screenshot_manager import take_full_page_screenshot, extract_page_text
 from core.image_utils import crop_screenshot
+from core.details_finder import union_xpath
 
 class HomeDepotAuditor:
     """Auditor implementation specific to Home Depot."""
@@ -19,6 +20,23 @@ class HomeDepotAuditor:
     RETAILER_NAME = "homedepot"
     # Updated path to prompts directory
     PROMPT_PATH = os.path.join("prompts", "prompt_homedepot.txt")
+    # Product Details expanders, in priority order
+    DETAIL_SELECTORS = [
+        # New selector based on user input (PRIORITIZED)
+        "//div[@class='navlink-pso' and normalize-space(.)='Product Details']",
+        # Original selectors as fallbacks
+        "//button[normalize-space(.)='Product Details']",
+        "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'product details')]",
+        "//button[@data-testid='product-details-accordion-button']",
+        "//div[@id='product-details__panel--container']//button",
+        "//a[normalize-space(.)='View More Details']",
+        "//div[contains(@class, 'accordion-title') and contains(., 'Details')]"
+    ]
+    DETAIL_UNION_XPATH = union_xpath(DETAIL_SELECTORS)
+
+    def __init__(self, browser_pool: Optional[BrowserPool] = None):
+        # Shared pool to borrow a warm browser from; None launches a fresh browser per capture
+        self.browser_pool = browser_pool
 
     def get_prompt_path(self) -> str:
         return self.PROMPT_PATH
@@ -50,22 +68,14 @@ class HomeDepotAuditor:
         current_position = 0
         max_scroll_attempts = 20
         scroll_attempts = 0
-        detail_selectors = [
-            # New selector based on user input (PRIORITIZED)
-            "//div[@class='navlink-pso' and normalize-space(.)='Product Details']",
-            # Original selectors as fallbacks
-            "//button[normalize-space(.)='Product Details']",
-            "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'product details')]",
-            "//button[@data-testid='product-details-accordion-button']",
-            "//div[@id='product-details__panel--container']//button",
-            "//a[normalize-space(.)='View More Details']",
-            "//div[contains(@class, 'accordion-title') and contains(., 'Details')]"
-        ]
         scroll_increment = 300
 
         print("Searching for Product Details button/link (Home Depot)...")
         while not found_details_button and scroll_attempts < max_scroll_attempts and current_position < total_height:
-            for selector in detail_selectors:
+            # A single union query first; the per-selector queries (which keep the priority order) only run once something matches
+            try: any_match = bool(driver.find_elements(By.XPATH, self.DETAIL_UNION_XPATH))
+            except Exception: any_match = True # Fall back to querying each selector
+            for selector in (self.DETAIL_SELECTORS if any_match else ()):
                 try:
                     elements = driver.find_elements(By.XPATH, selector)
                     for element in elements:
@@ -122,37 +132,35 @@ class HomeDepotAuditor:
         output_txt = f"{output_base_filename}.txt"
         print(f"Starting Home Depot capture for: {url}")
 
-        driver = None
         try:
-            driver = setup_browser()
-            driver.get(url)
-            print("Waiting for page load...")
-            time.sleep(5 + random.random() * 2)
+            # A driver whose capture raised is quit (or recycled by the pool) on the way out
+            with borrowed_browser(self.browser_pool) as driver:
+                driver.get(url)
+                print("Waiting for page load...")
+                time.sleep(5 + random.random() * 2)
 
-            self._handle_popups(driver)
-            time.sleep(1 + random.random())
+                self._handle_popups(driver)
+                time.sleep(1 + random.random())
 
-            details_opened = self._find_and_expand_details(driver)
-            if not details_opened: print("Warning: Failed to open product details section.")
-            else: print("Product details section interaction attempted.")
+                details_opened = self._find_and_expand_details(driver)
+                if not details_opened: print("Warning: Failed to open product details section.")
+                else: print("Product details section interaction attempted.")
 
-            screenshot_success = take_full_page_screenshot(driver, output_png)
-            text_success = extract_page_text(driver, output_png)
+                screenshot_success = take_full_page_screenshot(driver, output_png)
+                text_success = extract_page_text(driver, output_png)
 
-            if not screenshot_success or not text_success:
-                 print("Warning: Screenshot or text extraction might be incomplete.")
+                if not screenshot_success or not text_success:
+                     print("Warning: Screenshot or text extraction might be incomplete.")
 
             crop_success = crop_screenshot(output_png)
             if not crop_success: print("Warning: Screenshot cropping failed.")
 
-            driver.quit()
             print(f"Home Depot capture finished for: {url}")
             return True, ""
 
         except Exception as e:
             error_msg = f"Error during Home Depot capture for {url}: {str(e)}"
             print(f"ERROR: {error_msg}")
-            if driver: driver.quit()
             if os.path.exists(output_png): os.remove(output_png)
             if os.path.exists(output_txt): os.remove(output_txt)
             return False, error_msg
\ No newline at end of file
@@ -7,10 +7,10 @@ from selenium.webdriver.common.by import By
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from typing import Tuple # Added for type hinting
+from typing import Optional, Tuple # Added for type hinting
 
 # Import core functions
-from core.browser_setup import setup_browser
+from core.browser_pool import BrowserPool, borrowed_browser
 from core.screenshot_manager import take_full_page_screenshot, extract_page_text
 from core.image_utils import crop_screenshot
 
@@ -20,6 +20,10 @@ class LowesAuditor:
     RETAILER_NAME = "lowes"
     PROMPT_PATH = os.path.join("prompts", "prompt_lowes.txt")
 
+    def __init__(self, browser_pool: Optional[BrowserPool] = None):
+        # Shared pool to borrow a warm browser from; None launches a fresh browser per capture
+        self.browser_pool = browser_pool
+
     def get_prompt_path(self) -> str:
         return self.PROMPT_PATH
 
@@ -96,33 +100,31 @@ class LowesAuditor:
         output_txt = f"{output_base_filename}.txt"
         print(f"Starting Lowe's capture for: {url}")
 
-        driver = None
         try:
-            driver = setup_browser()
-            driver.get(url)
-            print("Waiting for page load...")
-            time.sleep(7 + random.random() * 4) # Initial wait
+            # A driver whose capture raised is quit (or recycled by the pool) on the way out
+            with borrowed_browser(self.browser_pool) as driver:
+                driver.get(url)
+                print("Waiting for page load...")
+                time.sleep(7 + random.random() * 4) # Initial wait
 
-            self._handle_popups(driver)
-            time.sleep(1 + random.random())
+                self._handle_popups(driver)
+                time.sleep(1 + random.random())
 
-            self._click_view_all_images(driver) # Attempt to click view all images
+                self._click_view_all_images(driver) # Attempt to click view all images
 
-            # Take screenshot and extract text
-            screenshot_success = take_full_page_screenshot(driver, output_png)
-            text_success = extract_page_text(driver, output_png)
+                # Take screenshot and extract text
+                screenshot_success = take_full_page_screenshot(driver, output_png)
+                text_success = extract_page_text(driver, output_png)
 
-            if not screenshot_success or not text_success:
-                 print("Warning: Screenshot or text extraction might be incomplete.")
+                if not screenshot_success or not text_success:
+                     print("Warning: Screenshot or text extraction might be incomplete.")
 
-            driver.quit()
             print(f"Lowe's capture finished for: {url}")
             return True, ""
 
         except Exception as e:
             error_msg = f"Error during Lowe's capture for {url}: {str(e)}"
             print(f"ERROR: {error_msg}")
-            if driver: driver.quit()
             if os.path.exists(output_png): os.remove(output_png)
             if os.path.exists(output_txt): os.remove(output_txt)
             return False, error_msg
\ No newline at end of file
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.csv_processor import read_analysis_fields
+from fix_and_convert import fix_analysis_files
+
+
+class FixAnalysisFilesTest(unittest.TestCase):
+    """fix_analysis_files must keep every value it can find, whatever the heading layout."""
+
+    def _fix(self, content):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "link1_homedepot_analysis.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        fix_analysis_files(folder)
+        with open(path, 'r', encoding='utf-8') as f:
+            return path, f.read()
+
+    def test_inline_headings(self):
+        path, _ = self._fix("**Link:** u **Category:** Tools\n**SKU:** 55 **Retailer:** Home Depot")
+        fields = read_analysis_fields(path)
+        self.assertEqual((fields["Link"], fields["Category"], fields["SKU"], fields["Retailer"]),
+                         ("u", "Tools", "55", "Home Depot"))
+
+    def test_bulleted_headings(self):
+        path, _ = self._fix("- **Link:** u\n- **SKU:** 55\n  * **Category:** Tools\n- **Description Actual:** d\n  more")
+        fields = read_analysis_fields(path)
+        self.assertEqual((fields["Link"], fields["SKU"], fields["Category"], fields["Description Actual"]),
+                         ("u", "55", "Tools", "d\n  more"))
+
+    def test_unseparable_heading_leaves_file_unchanged(self):
+        # "Pros/Cons" is no heading to the line parser, and the separator split cannot end Link before "Title Actual"
+        content = "**Link:** u\n**Title Actual:** Drill **Pros/Cons:** light\n**SKU:** 9"
+        _, fixed = self._fix(content)
+        self.assertEqual(fixed, content)
+
+
+if __name__ == "__main__":
+    unittest.main()